@@ -0,0 +1,119 @@
+import os
+import asyncio
+import hashlib
+import logging
+from typing import Dict, Optional, Tuple
+import discord
+
+# Guild setting holding {emoji name: {'hash': sha256 of the image, 'emoji_id': id}}
+EMOJI_ASSETS_KEY = 'emoji_assets'
+
+class AssetSync:
+    """
+    Keeps guild emoji in step with local image files. Each image is hashed
+    (off the event loop) and compared with the hash recorded in the config
+    store when it was last uploaded; an emoji is only uploaded when it is
+    missing or its image changed, so restarts and reconnects cost no API calls.
+    """
+
+    def __init__(self, config_manager, assets: Dict[str, str]):
+        """assets maps emoji name -> image path"""
+        self.config_manager = config_manager
+        self.assets = dict(assets)
+        self.logger = logging.getLogger(__name__)
+        # path -> ((mtime_ns, size), sha256, image bytes)
+        self._files: Dict[str, Tuple[Tuple[int, int], str, bytes]] = {}
+        # (guild_id, name) -> emoji
+        self.emojis: Dict[Tuple[int, str], discord.Emoji] = {}
+        self._guild_locks: Dict[int, asyncio.Lock] = {}
+        self.stats = {
+            'unchanged': 0,
+            'uploaded': 0,
+            'replaced': 0,
+            'adopted': 0,
+            'errors': 0
+        }
+
+    def get_emoji(self, guild_id: int, name: str) -> Optional[discord.Emoji]:
+        """The synced emoji for a guild, if any"""
+        return self.emojis.get((guild_id, name))
+
+    async def _read_asset(self, path: str) -> Tuple[str, bytes]:
+        """Hash and read an image in a thread, re-reading only when the file changed"""
+        return await asyncio.to_thread(self._read_asset_sync, path)
+
+    def _read_asset_sync(self, path: str) -> Tuple[str, bytes]:
+        st = os.stat(path)
+        stat = (st.st_mtime_ns, st.st_size)
+        cached = self._files.get(path)
+        if cached and cached[0] == stat:
+            return cached[1], cached[2]
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        self._files[path] = (stat, digest, data)
+        return digest, data
+
+    async def sync_guild(self, guild) -> Dict[str, discord.Emoji]:
+        """Create or update every managed emoji in a guild; returns name -> emoji"""
+        lock = self._guild_locks.setdefault(guild.id, asyncio.Lock())
+        async with lock:
+            records = dict(await self.config_manager.get_guild_setting(guild.id, EMOJI_ASSETS_KEY) or {})
+            synced = {}
+            for name, path in self.assets.items():
+                try:
+                    emoji, record = await self._sync_emoji(guild, name, path, records.get(name))
+                except (OSError, discord.HTTPException) as e:
+                    self.stats['errors'] += 1
+                    self.logger.warning(f"Could not sync emoji {name} in {guild.name}: {e}")
+                    continue
+                if emoji is None:
+                    continue
+                synced[name] = emoji
+                self.emojis[(guild.id, name)] = emoji
+                if record is not None:
+                    records[name] = record
+
+            if records != (await self.config_manager.get_guild_setting(guild.id, EMOJI_ASSETS_KEY) or {}):
+                await self.config_manager.set_guild_setting(guild.id, EMOJI_ASSETS_KEY, records)
+            return synced
+
+    async def _sync_emoji(self, guild, name: str, path: str, record: Optional[Dict]):
+        digest, data = await self._read_asset(path)
+        existing = None
+        if record:
+            existing = guild.get_emoji(record['emoji_id'])
+        if existing is None:
+            existing = discord.utils.get(guild.emojis, name=name)
+
+        if existing is not None:
+            if record and record['hash'] == digest and record['emoji_id'] == existing.id:
+                self.stats['unchanged'] += 1
+                return existing, record
+            if (not record or record['emoji_id'] != existing.id) and \
+                    digest == hashlib.sha256(await existing.read()).hexdigest():
+                # Uploaded before hashes were recorded, or the recorded emoji is
+                # gone and one by that name has the same image; keep it
+                self.stats['adopted'] += 1
+                return existing, {'hash': digest, 'emoji_id': existing.id}
+
+        if not guild.me.guild_permissions.manage_emojis:
+            self.logger.warning(f"No permission to manage emojis in {guild.name}")
+            return existing, record
+
+        # Upload the new image before deleting the old one so the name never goes missing
+        emoji = await guild.create_custom_emoji(name=name, image=data, reason="Managed emoji asset updated")
+        if existing is not None:
+            try:
+                await existing.delete(reason="Replaced by updated image")
+            except discord.HTTPException as e:
+                self.logger.warning(f"Could not delete old emoji {name}: {e}")
+            self.stats['replaced'] += 1
+            self.logger.info(f"Updated emoji {name} in {guild.name}")
+        else:
+            self.stats['uploaded'] += 1
+            self.logger.info(f"Uploaded emoji {name} to {guild.name}")
+        return emoji, {'hash': digest, 'emoji_id': emoji.id}
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats, managed_assets=len(self.assets), synced_emojis=len(self.emojis))
@@ -0,0 +1,80 @@
+"""
+Compare the JSON config path with compact ReactionRole records and the
+binary snapshot format: load time and memory per mapping.
+
+    python -m benchmarks.config_formats --mappings 50000 --guilds 200
+"""
+import gc
+import sys
+import time
+import json
+import argparse
+import tracemalloc
+from config_records import ReactionRole, compact_configs, encode_binary, decode_binary, reaction_key
+
+EMOJIS = ['🔴', '🟠', '🟡', '🟢', '🔵', '🟣', '<:violette_unicorn:1392004567524446200>', '<a:party_blob:1392004567524446201>']
+
+def build_configs(mappings: int, guilds: int):
+    """Synthetic configs shaped like real menus: one message per len(EMOJIS) mappings"""
+    configs = {}
+    base = 1288838226362105868
+    for i in range(mappings):
+        guild_id = base + i % guilds
+        message_id = base + 10_000_000 + i // len(EMOJIS)
+        channel_id = base + 1_000_000 + message_id % 7
+        emoji = EMOJIS[i % len(EMOJIS)]
+        configs.setdefault(str(guild_id), {})[reaction_key(channel_id, message_id, emoji)] = {
+            'guild_id': guild_id,
+            'channel_id': channel_id,
+            'message_id': message_id,
+            'emoji': emoji,
+            'role_id': base + 20_000_000 + i
+        }
+    return configs
+
+def measure(label, load, mappings, repeat):
+    """Best-of-N load time, and traced memory held by one loaded copy"""
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = load()
+        best = min(best, time.perf_counter() - start)
+        del result
+
+    gc.collect()
+    tracemalloc.start()
+    result = load()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return label, best, held / mappings
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mappings', type=int, default=20000)
+    parser.add_argument('--guilds', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    configs = build_configs(args.mappings, args.guilds)
+    json_text = json.dumps(configs, indent=2)
+    binary = encode_binary(compact_configs(json.loads(json_text)))
+
+    results = [
+        measure("json -> dicts", lambda: json.loads(json_text), args.mappings, args.repeat),
+        measure("json -> records", lambda: compact_configs(json.loads(json_text)), args.mappings, args.repeat),
+        measure("binary -> records", lambda: decode_binary(binary), args.mappings, args.repeat),
+    ]
+
+    print(f"{args.mappings} mappings across {args.guilds} guilds "
+          f"(json {len(json_text) / 1024:.0f} KiB, binary {len(binary) / 1024:.0f} KiB)")
+    print(f"{'format':<20}{'load ms':>10}{'bytes/mapping':>16}")
+    for label, seconds, per_mapping in results:
+        print(f"{label:<20}{seconds * 1000:>10.1f}{per_mapping:>16.0f}")
+    print(f"(ReactionRole instance: {sys.getsizeof(ReactionRole(1, 2, 3, 'x', 4))} bytes, "
+          f"5-key dict: {sys.getsizeof(configs[next(iter(configs))][next(iter(configs[next(iter(configs))]))])} bytes)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+Local stand-in for the YouTube endpoints the monitor polls: the Data API's
+playlistItems.list and the public channel Atom feed, both answering
+conditional requests (If-None-Match / If-Modified-Since) with 304.
+
+    python -m benchmarks.fake_youtube --polls 20 --upload-every 7
+    python -m benchmarks.fake_youtube --serve --port 8089
+
+The default mode runs YouTubeMonitor against the server for each source and
+reports requests, 304s, quota units and detected uploads. --serve just runs
+the server; point the bot at it with
+YOUTUBE_API_URL=http://127.0.0.1:8089/youtube/v3 and
+YOUTUBE_FEED_URL=http://127.0.0.1:8089/feeds/videos.xml.
+"""
+import sys
+import json
+import asyncio
+import hashlib
+import argparse
+from types import SimpleNamespace
+from email.utils import formatdate
+from xml.sax.saxutils import escape
+from aiohttp import web
+from youtube_monitor import YouTubeMonitor
+
+CHANNEL_ID = 'UCfakechannel000000000000'
+
+class FakeYouTube:
+    """Serves one channel's uploads; upload() adds a video"""
+
+    def __init__(self, channel_id: str = CHANNEL_ID, api_key: str = 'test-key'):
+        self.channel_id = channel_id
+        self.api_key = api_key
+        self.videos = []  # newest first: (video_id, title)
+        self.modified = formatdate(usegmt=True)
+        self.requests = 0
+        self.not_modified = 0
+        self._runner = None
+        self.app = web.Application()
+        self.app.router.add_get('/youtube/v3/playlistItems', self.playlist_items)
+        self.app.router.add_get('/feeds/videos.xml', self.feed)
+
+    def upload(self, video_id: str, title: str, modified: float = None):
+        self.videos.insert(0, (video_id, title))
+        # HTTP dates have one-second resolution
+        self.modified = formatdate(modified, usegmt=True)
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        host, port = self._runner.addresses[0][:2]
+        return f"http://{host}:{port}"
+
+    async def close(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    def _conditional(self, request: web.Request, body: str, content_type: str) -> web.Response:
+        """200 with validators, or 304 if the client's copy is current"""
+        self.requests += 1
+        etag = '"' + hashlib.sha256(body.encode('utf-8')).hexdigest()[:16] + '"'
+        if_none_match = request.headers.get('If-None-Match')
+        # If-None-Match wins over If-Modified-Since when both are sent
+        if (if_none_match == etag) or (if_none_match is None and
+                                       request.headers.get('If-Modified-Since') == self.modified):
+            self.not_modified += 1
+            return web.Response(status=304, headers={'ETag': etag, 'Last-Modified': self.modified})
+        return web.Response(text=body, content_type=content_type,
+                            headers={'ETag': etag, 'Last-Modified': self.modified})
+
+    async def playlist_items(self, request: web.Request) -> web.Response:
+        if request.query.get('key') != self.api_key:
+            return web.json_response({'error': {'code': 403, 'message': 'bad key'}}, status=403)
+        if request.query.get('playlistId') != 'UU' + self.channel_id[2:]:
+            return web.json_response({'error': {'code': 404, 'message': 'playlistNotFound'}}, status=404)
+        limit = int(request.query.get('maxResults', '5'))
+        body = json.dumps({
+            'kind': 'youtube#playlistItemListResponse',
+            'items': [
+                {'snippet': {'title': title, 'resourceId': {'kind': 'youtube#video', 'videoId': video_id}}}
+                for video_id, title in self.videos[:limit]
+            ]
+        })
+        return self._conditional(request, body, 'application/json')
+
+    async def feed(self, request: web.Request) -> web.Response:
+        if request.query.get('channel_id') != self.channel_id:
+            return web.Response(status=404)
+        entries = ''.join(
+            f"<entry><yt:videoId>{escape(video_id)}</yt:videoId><title>{escape(title)}</title></entry>"
+            for video_id, title in self.videos[:15]
+        )
+        body = ('<?xml version="1.0" encoding="UTF-8"?>'
+                '<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" xmlns="http://www.w3.org/2005/Atom">'
+                f"<title>fake</title>{entries}</feed>")
+        return self._conditional(request, body, 'application/atom+xml')
+
+async def run_source(source: str, args) -> None:
+    server = FakeYouTube()
+    for index in range(3):
+        server.upload(f"old{index}", f"Old video {index}", modified=1_700_000_000 + index)
+    base = await server.start()
+
+    monitor = YouTubeMonitor(SimpleNamespace(), api_url=f"{base}/youtube/v3", feed_url=f"{base}/feeds/videos.xml")
+    monitor.source = source
+    monitor.api_key = server.api_key
+    monitor.channel_id = server.channel_id
+    announced = []
+
+    async def record(video_id, title):
+        announced.append(video_id)
+    monitor._send_notification = record
+
+    uploads = 0
+    for poll in range(args.polls):
+        if poll and args.upload_every and poll % args.upload_every == 0:
+            uploads += 1
+            server.upload(f"new{uploads}", f"New video {uploads}", modified=1_800_000_000 + poll)
+        await monitor.check_for_new_videos()
+    await monitor.close()
+    await server.close()
+
+    stats = monitor.get_stats()
+    print(f"{source:<10}{server.requests:>10}{server.not_modified:>8}{stats['quota_units']:>8}"
+          f"{uploads:>9}{len(announced):>10}")
+
+async def serve(args) -> None:
+    server = FakeYouTube()
+    server.upload('old0', 'Old video 0')
+    base = await server.start(port=args.port)
+    print(f"serving {server.channel_id} at {base}; press Enter to upload a video, Ctrl+C to stop")
+    count = 0
+    while True:
+        await asyncio.to_thread(sys.stdin.readline)
+        count += 1
+        server.upload(f"new{count}", f"New video {count}")
+        print(f"uploaded new{count}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--polls', type=int, default=20)
+    parser.add_argument('--upload-every', type=int, default=7, help="upload a video every N polls (0 = never)")
+    parser.add_argument('--serve', action='store_true', help="only run the server")
+    parser.add_argument('--port', type=int, default=8089)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        try:
+            asyncio.run(serve(args))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    print(f"{'source':<10}{'requests':>10}{'304s':>8}{'quota':>8}{'uploads':>9}{'detected':>10}")
+    for source in ('playlist', 'feed'):
+        asyncio.run(run_source(source, args))
+    # search.list, which this replaces, costs 100 units on every poll
+    print(f"search.list would have used {args.polls * 100} quota units for the same polls")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+Resident memory and time-to-ready of the 'full' and 'lazy' member cache
+policies on a synthetic large guild. Each policy runs in its own process so
+max RSS is not shared between them.
+
+    python -m benchmarks.member_cache --members 200000 --configured-guilds 0
+
+'full' builds and caches every member through discord.py's own Guild/Member
+classes, the way the startup chunk requests do, before ready. 'lazy' only
+builds the guilds before ready, then chunks the --configured-guilds guilds
+that have reaction roles after ready. 'ready s' and 'after s' are measured
+CPU-side times for those two phases. There is no gateway here, so transfer
+time is reported separately as 'net s (model)': --chunk-latency per
+1000-member GUILD_MEMBERS_CHUNK received before ready.
+"""
+import gc
+import sys
+import time
+import resource
+import argparse
+import subprocess
+import discord
+from discord.state import ConnectionState
+
+CHUNK_SIZE = 1000
+BASE_ID = 1288838226362105868
+
+def guild_payload(guild_id: int, members: int, roles: int = 50):
+    return {
+        'id': str(guild_id),
+        'name': f"guild-{guild_id}",
+        'owner_id': str(BASE_ID),
+        'member_count': members,
+        'large': True,
+        'features': [],
+        'emojis': [],
+        'stickers': [],
+        'channels': [],
+        'members': [],
+        'roles': [
+            {'id': str(guild_id + i), 'name': f"role-{i}", 'permissions': '0', 'position': i,
+             'color': 0, 'hoist': False, 'managed': False, 'mentionable': False, 'flags': 0}
+            for i in range(roles)
+        ]
+    }
+
+def member_payload(user_id: int, guild_id: int):
+    return {
+        'user': {'id': str(user_id), 'username': f"user{user_id}", 'discriminator': '0',
+                 'global_name': None, 'avatar': None},
+        'roles': [str(guild_id + 1 + user_id % 5)],
+        'joined_at': '2024-01-01T00:00:00+00:00',
+        'deaf': False,
+        'mute': False,
+        'flags': 0
+    }
+
+def make_state(policy: str) -> ConnectionState:
+    intents = discord.Intents.default()
+    intents.members = True
+    if policy == 'full':
+        options = {}
+    else:
+        options = {'member_cache_flags': discord.MemberCacheFlags(voice=True, joined=True),
+                   'chunk_guilds_at_startup': False}
+    return ConnectionState(dispatch=lambda *args: None, handlers={}, hooks={}, http=None,
+                           intents=intents, **options)
+
+def chunk_into_cache(state: ConnectionState, guild, members: int):
+    """What a completed chunk request does: build every Member and cache it"""
+    for start in range(0, members, CHUNK_SIZE):
+        for user_id in range(start, min(start + CHUNK_SIZE, members)):
+            guild._add_member(discord.Member(data=member_payload(BASE_ID + user_id, guild.id), guild=guild, state=state))
+    return (members + CHUNK_SIZE - 1) // CHUNK_SIZE
+
+def child(args):
+    state = make_state(args.policy)
+    gc.collect()
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Everything up to ready: GUILD_CREATE, plus the startup chunk requests under 'full'
+    start = time.perf_counter()
+    guilds = []
+    chunks = 0
+    for index in range(args.guilds):
+        guild_id = BASE_ID + 1_000_000 * (index + 1)
+        # Large guilds arrive in GUILD_CREATE without their member list
+        guild = state._add_guild_from_data(guild_payload(guild_id, args.members))
+        guilds.append(guild)
+        if args.policy == 'full':
+            chunks += chunk_into_cache(state, guild, args.members)
+    ready = time.perf_counter() - start
+
+    # 'lazy' chunks the configured guilds once ready has fired
+    start = time.perf_counter()
+    if args.policy == 'lazy':
+        for guild in guilds[:args.configured_guilds]:
+            chunk_into_cache(state, guild, args.members)
+    after_ready = time.perf_counter() - start
+
+    cached = sum(len(guild._members) for guild in state._guilds.values())
+    rss = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) / 1024
+    if sys.platform == 'darwin':
+        rss /= 1024  # ru_maxrss is bytes on macOS, KiB elsewhere
+    print(f"{args.policy:<6}{cached:>12}{rss:>12.1f}{ready:>12.2f}{after_ready:>12.2f}"
+          f"{chunks * args.chunk_latency:>16.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--members', type=int, default=100_000, help="members per guild")
+    parser.add_argument('--guilds', type=int, default=1)
+    parser.add_argument('--configured-guilds', type=int, default=0,
+                        help="guilds with reaction roles, chunked after ready under 'lazy'")
+    parser.add_argument('--chunk-latency', type=float, default=0.05, help="modelled seconds per member chunk")
+    parser.add_argument('--policy', choices=('full', 'lazy'))
+    args = parser.parse_args(argv)
+
+    if args.policy:
+        child(args)
+        return 0
+
+    print(f"{args.guilds} guild(s) x {args.members} members, {args.configured_guilds} configured")
+    print(f"{'policy':<6}{'cached':>12}{'RSS MiB':>12}{'ready s':>12}{'after s':>12}{'net s (model)':>16}")
+    for policy in ('full', 'lazy'):
+        argv = [sys.executable, '-m', 'benchmarks.member_cache', '--policy', policy,
+                '--members', str(args.members), '--guilds', str(args.guilds),
+                '--configured-guilds', str(args.configured_guilds), '--chunk-latency', str(args.chunk_latency)]
+        subprocess.run(argv, check=True)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Drive ReactionHandler with a synthetic reaction storm against stub guilds
+(no network) and report throughput, handler latency, simulated REST calls
+and allocations per event.
+
+    python -m benchmarks.reaction_storm --events 20000 --rate 2000 --mappings 50000
+    python -m benchmarks.reaction_storm --rate 0 --window 0 --cached-ratio 0.5
+"""
+import gc
+import sys
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tracemalloc
+from config_manager import ConfigManager
+from config_records import compact_configs
+from member_resolver import MemberResolver
+from rate_limit import GuildRequestScheduler
+from reaction_handler import ReactionHandler
+from role_mutations import RoleMutationCoalescer
+from benchmarks.config_formats import build_configs
+from benchmarks.stubs import StubBot, StubHTTP, MemoryStorage, make_payload
+
+def build_events(config_manager: ConfigManager, count: int, users: int, remove_ratio: float, seed: int):
+    """Reaction events on random configured mappings, with members clicking several items each"""
+    rng = random.Random(seed)
+    mappings = list(config_manager._reaction_index.values())
+    events = []
+    for _ in range(count):
+        config = rng.choice(mappings)
+        event_type = 'REACTION_REMOVE' if rng.random() < remove_ratio else 'REACTION_ADD'
+        events.append(make_payload(event_type, config['guild_id'], config['channel_id'],
+                                   config['message_id'], 10_000 + rng.randrange(users), config['emoji']))
+    return events
+
+async def setup(args):
+    http = StubHTTP(latency=args.rest_latency)
+    bot = StubBot(http, cached_ratio=args.cached_ratio)
+    config_manager = ConfigManager(MemoryStorage(compact_configs(build_configs(args.mappings, args.guilds))))
+    await config_manager.load_config()
+    role_mutations = RoleMutationCoalescer(
+        GuildRequestScheduler(global_rate=args.global_rate, max_concurrency=args.concurrency),
+        MemberResolver(),
+        window=args.window
+    )
+    handler = ReactionHandler(bot, config_manager, role_mutations)
+    return http, config_manager, role_mutations, handler
+
+async def storm(handler: ReactionHandler, events, rate: float):
+    """Dispatch events at `rate` per second (0 = as fast as possible); returns latencies and wall time"""
+    latencies = []
+
+    async def dispatch(payload):
+        start = time.perf_counter()
+        if payload.event_type == 'REACTION_ADD':
+            await handler.handle_reaction_add(payload)
+        else:
+            await handler.handle_reaction_remove(payload)
+        latencies.append(time.perf_counter() - start)
+
+    loop = asyncio.get_running_loop()
+    tasks = []
+    started = loop.time()
+    for i, payload in enumerate(events):
+        if rate:
+            delay = started + i / rate - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        # Like discord.py, every event gets its own task
+        tasks.append(asyncio.create_task(dispatch(payload)))
+        if not rate and i % 100 == 99:
+            await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    return latencies, loop.time() - started
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+async def run(args):
+    http, config_manager, role_mutations, handler = await setup(args)
+    events = build_events(config_manager, args.events, args.users, args.remove_ratio, args.seed)
+    latencies, wall = await storm(handler, events, args.rate)
+
+    # Separate pass for allocations so tracing does not skew the timings
+    _, _, _, alloc_handler = await setup(args)
+    alloc_events = build_events(alloc_handler.config_manager, min(args.events, 2000),
+                                args.users, args.remove_ratio, args.seed)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    await storm(alloc_handler, alloc_events, 0)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    net_blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+
+    print(f"{args.events} events on {args.mappings} mappings across {args.guilds} guilds, "
+          f"{args.users} users, rate {args.rate or 'max'}/s, window {args.window * 1000:.0f} ms")
+    print(f"throughput        {args.events / wall:>10.0f} events/s")
+    print(f"handler p50       {percentile(latencies, 0.5) * 1000:>10.2f} ms")
+    print(f"handler p99       {percentile(latencies, 0.99) * 1000:>10.2f} ms")
+    print(f"REST calls        {http.total:>10} ({http.total / args.events:.3f} per event)")
+    for route, calls in sorted(http.calls.items()):
+        print(f"  {route:<48}{calls:>8}")
+    print(f"peak traced       {peak / len(alloc_events):>10.0f} bytes/event")
+    print(f"net new blocks    {net_blocks / len(alloc_events):>10.2f} per event")
+    print(f"role queue        {role_mutations.get_stats()}")
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=10000)
+    parser.add_argument('--rate', type=float, default=1000.0, help="events per second, 0 for as fast as possible")
+    parser.add_argument('--mappings', type=int, default=20000)
+    parser.add_argument('--guilds', type=int, default=100)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--remove-ratio', type=float, default=0.3)
+    parser.add_argument('--cached-ratio', type=float, default=1.0, help="share of members in the member cache")
+    parser.add_argument('--window', type=float, default=0.5, help="role change coalescing window in seconds")
+    parser.add_argument('--rest-latency', type=float, default=0.0, help="simulated REST latency in seconds")
+    parser.add_argument('--global-rate', type=float, default=1_000_000.0, help="scheduler global request rate")
+    parser.add_argument('--concurrency', type=int, default=64, help="scheduler concurrent requests")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    # The handlers log every assignment; keep that out of the measurement
+    logging.basicConfig(level=logging.WARNING)
+    return asyncio.run(run(args))
+
+if __name__ == '__main__':
+    sys.exit(main())
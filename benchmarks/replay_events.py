@@ -0,0 +1,149 @@
+"""
+Replay a gateway trace recorded with RECORD_EVENTS=<path> through the
+reaction-role handlers against the stub HTTP layer, at recorded speed or as
+fast as possible, and report throughput, latency and REST calls.
+
+    python -m benchmarks.replay_events trace.jsonl.gz --speed 0
+    python -m benchmarks.replay_events trace.jsonl --speed 1 --config config.json
+
+Without --config every reacted (message, emoji) in the trace is mapped to a
+synthetic role, so a trace can be replayed on its own. Interactions are
+recorded but not replayed: they need a live interaction webhook to answer.
+"""
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+from collections import Counter
+from config_manager import ConfigManager
+from config_records import compact_configs, reaction_key
+from event_recorder import read_trace
+from member_resolver import MemberResolver
+from rate_limit import GuildRequestScheduler
+from reaction_handler import ReactionHandler
+from role_mutations import RoleMutationCoalescer
+from benchmarks.reaction_storm import percentile
+from benchmarks.stubs import StubBot, StubHTTP, MemoryStorage, make_payload
+
+REACTION_EVENTS = ('MESSAGE_REACTION_ADD', 'MESSAGE_REACTION_REMOVE')
+
+def emoji_key(emoji: dict) -> str:
+    """Config key form of a gateway emoji object"""
+    if emoji.get('id'):
+        return f"<{'a' if emoji.get('animated') else ''}:{emoji['name']}:{emoji['id']}>"
+    return emoji['name']
+
+def configs_from_trace(path: str):
+    """Map every reacted (message, emoji) in the trace to a synthetic role"""
+    configs = {}
+    for event in read_trace(path):
+        if event['t'] not in REACTION_EVENTS or not event['d'].get('guild_id'):
+            continue
+        data = event['d']
+        guild_id, channel_id, message_id = int(data['guild_id']), int(data['channel_id']), int(data['message_id'])
+        emoji = emoji_key(data['emoji'])
+        guild_config = configs.setdefault(str(guild_id), {})
+        key = reaction_key(channel_id, message_id, emoji)
+        if key not in guild_config:
+            guild_config[key] = {
+                'guild_id': guild_id,
+                'channel_id': channel_id,
+                'message_id': message_id,
+                'emoji': emoji,
+                'role_id': 10_000_000 + len(guild_config)
+            }
+    return configs
+
+async def replay(args):
+    if args.config:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            configs = json.load(f)
+    else:
+        configs = configs_from_trace(args.trace)
+
+    http = StubHTTP(latency=args.rest_latency)
+    bot = StubBot(http, cached_ratio=args.cached_ratio)
+    config_manager = ConfigManager(MemoryStorage(compact_configs(configs)))
+    await config_manager.load_config()
+    handler = ReactionHandler(bot, config_manager, RoleMutationCoalescer(
+        GuildRequestScheduler(global_rate=args.global_rate), MemberResolver(), window=args.window
+    ))
+
+    counts = Counter()
+    latencies = []
+
+    async def dispatch(event):
+        data = event['d']
+        start = time.perf_counter()
+        if event['t'] in REACTION_EVENTS:
+            payload = make_payload(
+                'REACTION_ADD' if event['t'] == 'MESSAGE_REACTION_ADD' else 'REACTION_REMOVE',
+                int(data['guild_id']), int(data['channel_id']), int(data['message_id']),
+                int(data['user_id']), emoji_key(data['emoji'])
+            )
+            if payload.event_type == 'REACTION_ADD':
+                await handler.handle_reaction_add(payload)
+            else:
+                await handler.handle_reaction_remove(payload)
+        elif event['t'] == 'GUILD_ROLE_DELETE':
+            await config_manager.remove_role_mappings(int(data['guild_id']), int(data['role_id']))
+        elif event['t'] == 'CHANNEL_DELETE':
+            await config_manager.remove_channel_mappings(int(data['guild_id']), int(data['id']))
+        elif event['t'] in ('MESSAGE_DELETE', 'MESSAGE_DELETE_BULK'):
+            message_ids = {int(i) for i in data.get('ids', [data.get('id')]) if i}
+            await config_manager.remove_message_mappings(int(data['guild_id']), message_ids)
+        else:
+            counts['skipped'] += 1
+            return
+        latencies.append(time.perf_counter() - start)
+
+    loop = asyncio.get_running_loop()
+    tasks = []
+    started = loop.time()
+    first_ts = None
+    for event in read_trace(args.trace):
+        if event['t'] != 'INTERACTION_CREATE' and not event['d'].get('guild_id'):
+            continue  # DMs carry no reaction roles
+        if first_ts is None:
+            first_ts = event['ts']
+        if args.speed:
+            delay = started + (event['ts'] - first_ts) / args.speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        counts[event['t']] += 1
+        tasks.append(asyncio.create_task(dispatch(event)))
+        if not args.speed and len(tasks) % 100 == 0:
+            await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    wall = loop.time() - started
+
+    total = sum(counts.values()) - 2 * counts['skipped']
+    print(f"replayed {total} events in {wall:.2f}s ({total / wall if wall else 0:.0f} events/s, "
+          f"speed {args.speed or 'max'})")
+    for name, count in sorted(counts.items()):
+        print(f"  {name:<28}{count:>8}")
+    if latencies:
+        print(f"handler p50 {percentile(latencies, 0.5) * 1000:.2f} ms, p99 {percentile(latencies, 0.99) * 1000:.2f} ms")
+    print(f"REST calls {http.total}")
+    for route, calls in sorted(http.calls.items()):
+        print(f"  {route:<48}{calls:>8}")
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('trace', help="JSONL trace (optionally .gz) written by the event recorder")
+    parser.add_argument('--speed', type=float, default=0.0, help="1 = recorded speed, 0 = as fast as possible")
+    parser.add_argument('--config', help="config.json to replay against instead of synthetic mappings")
+    parser.add_argument('--cached-ratio', type=float, default=1.0)
+    parser.add_argument('--window', type=float, default=0.5)
+    parser.add_argument('--rest-latency', type=float, default=0.0)
+    parser.add_argument('--global-rate', type=float, default=1_000_000.0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    return asyncio.run(replay(args))
+
+if __name__ == '__main__':
+    sys.exit(main())
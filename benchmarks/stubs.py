@@ -0,0 +1,158 @@
+"""
+Network-free stand-ins for the discord.py objects the reaction-role hot path
+touches. Every simulated REST call is counted in StubHTTP.
+"""
+import asyncio
+from types import SimpleNamespace
+from typing import Dict, List
+import discord
+from config_storage import ConfigStorage
+
+class StubHTTP:
+    """Counts simulated REST calls and adds a fixed latency to each"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: Dict[str, int] = {}
+
+    async def request(self, route: str):
+        self.calls[route] = self.calls.get(route, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        else:
+            await asyncio.sleep(0)
+
+    @property
+    def total(self) -> int:
+        return sum(self.calls.values())
+
+class StubRole:
+    def __init__(self, guild: 'StubGuild', role_id: int, position: int):
+        self.guild = guild
+        self.id = role_id
+        self.name = f"role-{role_id}"
+        self.position = position
+
+    def is_default(self) -> bool:
+        return self.id == self.guild.id
+
+    def __ge__(self, other: 'StubRole') -> bool:
+        return self.position >= other.position
+
+    def __lt__(self, other: 'StubRole') -> bool:
+        return self.position < other.position
+
+class StubMember:
+    def __init__(self, guild: 'StubGuild', user_id: int, roles: List[StubRole]):
+        self.guild = guild
+        self.id = user_id
+        self.display_name = f"user-{user_id}"
+        self.roles = roles
+        self.guild_permissions = SimpleNamespace(manage_roles=True)
+
+    @property
+    def top_role(self) -> StubRole:
+        return max(self.roles, key=lambda role: role.position)
+
+    async def edit(self, *, roles: List[StubRole], reason: str = None):
+        await self.guild.http.request('PATCH /guilds/{guild_id}/members/{user_id}')
+        self.roles = [self.guild.default_role] + [self.guild.get_role(role.id) for role in roles]
+
+    async def add_roles(self, *roles: StubRole, reason: str = None):
+        for role in roles:
+            await self.guild.http.request('PUT /guilds/{guild_id}/members/{user_id}/roles/{role_id}')
+            if role not in self.roles:
+                self.roles.append(role)
+
+    async def remove_roles(self, *roles: StubRole, reason: str = None):
+        for role in roles:
+            await self.guild.http.request('DELETE /guilds/{guild_id}/members/{user_id}/roles/{role_id}')
+            if role in self.roles:
+                self.roles.remove(role)
+
+    def __str__(self):
+        return self.display_name
+
+class StubGuild:
+    """
+    Guild whose roles exist on demand. `cached_ratio` of members are in the
+    member cache; the rest need a (counted) fetch_member call.
+    """
+
+    def __init__(self, guild_id: int, http: StubHTTP, bot_id: int, cached_ratio: float = 1.0):
+        self.id = guild_id
+        self.name = f"guild-{guild_id}"
+        self.http = http
+        self.chunked = True
+        self.cached_ratio = cached_ratio
+        self.default_role = StubRole(self, guild_id, 0)
+        self._roles: Dict[int, StubRole] = {}
+        self._members: Dict[int, StubMember] = {}
+        bot_role = StubRole(self, guild_id + 1, 1_000_000)
+        self.me = StubMember(self, bot_id, [self.default_role, bot_role])
+
+    def get_role(self, role_id: int) -> StubRole:
+        role = self._roles.get(role_id)
+        if role is None:
+            role = self._roles[role_id] = StubRole(self, role_id, 1 + len(self._roles))
+        return role
+
+    def _member(self, user_id: int) -> StubMember:
+        member = self._members.get(user_id)
+        if member is None:
+            member = self._members[user_id] = StubMember(self, user_id, [self.default_role])
+        return member
+
+    def get_member(self, user_id: int):
+        # Deterministic split between cached and uncached members
+        if (user_id % 1000) < self.cached_ratio * 1000:
+            return self._member(user_id)
+        return None
+
+    async def fetch_member(self, user_id: int) -> StubMember:
+        await self.http.request('GET /guilds/{guild_id}/members/{user_id}')
+        return self._member(user_id)
+
+class StubBot:
+    def __init__(self, http: StubHTTP, cached_ratio: float = 1.0, bot_id: int = 1):
+        self.http = http
+        self.cached_ratio = cached_ratio
+        self.user = SimpleNamespace(id=bot_id)
+        self.guilds_by_id: Dict[int, StubGuild] = {}
+
+    def get_guild(self, guild_id: int) -> StubGuild:
+        guild = self.guilds_by_id.get(guild_id)
+        if guild is None:
+            guild = self.guilds_by_id[guild_id] = StubGuild(guild_id, self.http, self.user.id, self.cached_ratio)
+        return guild
+
+    @property
+    def guilds(self) -> List[StubGuild]:
+        return list(self.guilds_by_id.values())
+
+class MemoryStorage(ConfigStorage):
+    """Config backend that keeps everything in memory"""
+
+    name = 'memory'
+
+    def __init__(self, configs: Dict = None):
+        self.configs = configs or {}
+
+    async def load(self) -> Dict:
+        return self.configs
+
+    async def persist(self, records, configs):
+        self.configs = configs
+
+def make_payload(event_type: str, guild_id: int, channel_id: int, message_id: int,
+                 user_id: int, emoji: str) -> SimpleNamespace:
+    """Fields of a RawReactionActionEvent that the handlers read"""
+    return SimpleNamespace(
+        event_type=event_type,
+        guild_id=guild_id,
+        channel_id=channel_id,
+        message_id=message_id,
+        user_id=user_id,
+        emoji=discord.PartialEmoji.from_str(emoji),
+        member=None
+    )
@@ -2,17 +2,29 @@ import discord
 from discord.ext import commands
 import logging
 import asyncio
-from commands import setup_commands
+import os
+from commands import setup_commands, WelcomeView
 from reaction_handler import ReactionHandler
+from role_mutations import RoleMutationCoalescer
+from rate_limit import GuildRequestScheduler
+from member_resolver import MemberResolver
+from reconciler import ReactionReconciler
+from event_recorder import EventRecorder
+from startup import StartupOrchestrator, GUILD
+from asset_sync import AssetSync
+from welcome import WelcomeMessages, WelcomeGrants
 from config_manager import ConfigManager
+from config_storage import create_storage
 from youtube_monitor import YouTubeMonitor
 from music_player import MusicPlayer
 import constants
 
+MAIN_GUILD_ID = 1288838226362105868
+
 class ReactionRoleBot(commands.Bot):
     """Main Discord bot class for reaction role functionality"""
     
-    def __init__(self):
+    def __init__(self, **options):
         # Set up bot intents
         intents = discord.Intents.default()
         intents.message_content = True
@@ -20,60 +32,135 @@ class ReactionRoleBot(commands.Bot):
         intents.guilds = True
         intents.members = True
         
+        # RECORD_EVENTS=<path> records handled gateway events for the replay tool
+        record_path = os.getenv('RECORD_EVENTS')
+        
         super().__init__(
             command_prefix='!',
             intents=intents,
-            help_command=commands.DefaultHelpCommand()
+            help_command=commands.DefaultHelpCommand(),
+            # Sent with every IDENTIFY, so reconnects keep it without a presence update
+            activity=discord.Activity(type=discord.ActivityType.watching, name="for reactions | !help"),
+            enable_debug_events=bool(record_path),
+            # 429s asking for longer waits raise discord.RateLimited instead of
+            # sleeping, so the role scheduler can slow the guild down (30s is the minimum)
+            max_ratelimit_timeout=30.0,
+            **self._member_cache_options(),
+            **options
         )
+        self.event_recorder = EventRecorder(record_path) if record_path else None
         
         # Initialize components
-        self.config_manager = ConfigManager()
-        self.reaction_handler = ReactionHandler(self, self.config_manager)
+        self.config_manager = ConfigManager(self._create_config_storage())
+        # Every member role edit goes through one scheduler shared by reactions and buttons
+        self.role_scheduler = GuildRequestScheduler()
+        self.member_resolver = MemberResolver()
+        self.role_mutations = RoleMutationCoalescer(self.role_scheduler, self.member_resolver)
+        self.reaction_handler = ReactionHandler(self, self.config_manager, self.role_mutations)
+        # Set RECONCILE_REMOVALS=1 to also revoke roles from members who no longer react.
+        # Cluster workers share a working directory, so each keeps its own checkpoint
+        shard_ids = options.get('shard_ids')
+        self.reconciler = ReactionReconciler(
+            self, self.config_manager, self.role_mutations,
+            checkpoint_file=f"reconcile_checkpoint.shards-{'_'.join(map(str, shard_ids))}.json"
+            if shard_ids else 'reconcile_checkpoint.json',
+            remove_missing=os.getenv('RECONCILE_REMOVALS') == '1'
+        )
         self.youtube_monitor = YouTubeMonitor(self)
         self.music_player = MusicPlayer(self)
+        self.asset_sync = AssetSync(self.config_manager, constants.MANAGED_EMOJI)
+        self.custom_emoji = None
+        self.welcome_messages = WelcomeMessages(self, self.config_manager)
+        self.welcome_grants = WelcomeGrants(self.role_mutations)
+        self._youtube_task = None
         
         # Set up logging
         self.logger = logging.getLogger(__name__)
         
+        # on_ready fires on every reconnect; the orchestrator runs each task once
+        self.startup = StartupOrchestrator()
+        self._register_startup_tasks()
+        
+    @staticmethod
+    def _member_cache_options():
+        """
+        Member cache policy from the MEMBER_CACHE environment variable.
+        'full' chunks and caches every member of every guild at login; the
+        default 'lazy' only caches voice members and members seen joining,
+        and chunks guilds with reaction roles or a welcome message after ready.
+        """
+        if os.getenv('MEMBER_CACHE', 'lazy') == 'full':
+            return {}
+        return {
+            'member_cache_flags': discord.MemberCacheFlags(voice=True, joined=True),
+            'chunk_guilds_at_startup': False
+        }
+        
+    @staticmethod
+    def _create_config_storage():
+        """Pick the config storage backend from the CONFIG_BACKEND environment variable"""
+        backend = os.getenv('CONFIG_BACKEND', 'json')
+        if backend == 'sqlite':
+            return create_storage('sqlite', db_file=os.getenv('CONFIG_DB_FILE', 'config.db'))
+        if backend == 'sharded':
+            return create_storage('sharded', directory=os.getenv('CONFIG_DIR', 'configs'))
+        if backend == 'binary':
+            return create_storage('binary', config_file=os.getenv('CONFIG_BINARY_FILE', 'config.bin'), write_behind=True)
+        if backend == 'journal':
+            return create_storage('journal', journal_file=os.getenv('CONFIG_JOURNAL_FILE', 'config.journal'))
+        return create_storage('json', write_behind=True)
+        
+    def _register_startup_tasks(self):
+        """Work done once per process, or once per guild, after the first ready"""
+        is_main_guild = lambda guild: guild.id == MAIN_GUILD_ID
+        self.startup.register('nickname', self._set_nickname, scope=GUILD, guilds=is_main_guild)
+        self.startup.register('custom_emoji', self._setup_custom_emoji, scope=GUILD, guilds=is_main_guild)
+        self.startup.register('welcome_message', self._send_welcome_message, scope=GUILD,
+                              guilds=is_main_guild, after=['custom_emoji'])
+        # Chunk the guilds that need their members one at a time, then catch
+        # up on reactions missed while offline
+        self.startup.register('chunk_members', self._chunk_guild, scope=GUILD, concurrency=1,
+                              guilds=lambda guild: self.config_manager.has_guild_config(guild.id))
+        self.startup.register('reconcile', self._start_reconciler, after=['chunk_members'])
+        self.startup.register('youtube_monitor', self._start_youtube_monitor)
+        
+    def owns_guild(self, guild_id: int) -> bool:
+        """Whether this process handles the guild (always, unless clustered)"""
+        return True
+        
     async def setup_hook(self):
         """Called when the bot is starting up"""
         # Load existing configurations
         await self.config_manager.load_config()
+        # Pick up hand or deploy-script edits of the config file without a restart
+        self.config_manager.start_watching()
         
         # Set up all commands (reaction roles, YouTube, music)
         await setup_commands(self)
         
+        # Route welcome button clicks on messages sent before this start
+        self.add_view(WelcomeView(self))
+        
+        # Deleted roles/channels/messages are handled incrementally from events;
+        # the full sweep only runs occasionally as a consistency check
+        asyncio.create_task(self._config_consistency_loop())
+        
         self.logger.info("Bot setup completed")
         
+    async def close(self):
+        """Flush pending configuration writes before disconnecting"""
+        await self.config_manager.close()
+        await self.youtube_monitor.close()
+        if self.event_recorder:
+            await self.event_recorder.close()
+        await super().close()
+        
     async def on_ready(self):
         """Called when the bot has successfully connected to Discord"""
         self.logger.info(f'{self.user} has connected to Discord!')
         self.logger.info(f'Bot is in {len(self.guilds)} guilds')
         
-        # Set bot activity
-        activity = discord.Activity(
-            type=discord.ActivityType.watching,
-            name="for reactions | !help"
-        )
-        await self.change_presence(activity=activity)
-        
-        # Only process specific guild on startup to avoid rate limiting
-        for guild in self.guilds:
-            # Only do setup for the main server to reduce API calls
-            if guild.id == 1288838226362105868:
-                try:
-                    await asyncio.sleep(1)  # Add delay to prevent rate limiting
-                    await guild.me.edit(nick="大賢者")
-                except (discord.Forbidden, discord.HTTPException):
-                    pass
-                
-                # Setup emoji and welcome message only for main server
-                await self._setup_custom_emoji(guild)
-                await self._send_welcome_message(guild)
-                break  # Only process the main server
-        
-        # Start YouTube monitoring
-        asyncio.create_task(self.youtube_monitor.start_monitoring())
+        await self.startup.run(self.guilds)
         
     async def on_guild_join(self, guild):
         """Called when the bot joins a new guild"""
@@ -81,6 +168,7 @@ class ReactionRoleBot(commands.Bot):
         
         # Send welcome message automatically in the first available channel
         await self._send_welcome_message(guild)
+        await self.startup.run_guild(guild)
         
     async def on_guild_remove(self, guild):
         """Called when the bot leaves a guild"""
@@ -88,6 +176,11 @@ class ReactionRoleBot(commands.Bot):
         # Clean up configurations for this guild
         await self.config_manager.cleanup_guild(guild.id)
         
+    async def on_socket_raw_receive(self, msg):
+        """Only dispatched when recording is enabled"""
+        if self.event_recorder:
+            self.event_recorder.record(msg)
+            
     async def on_raw_reaction_add(self, payload):
         """Handle reaction additions"""
         await self.reaction_handler.handle_reaction_add(payload)
@@ -96,6 +189,70 @@ class ReactionRoleBot(commands.Bot):
         """Handle reaction removals"""
         await self.reaction_handler.handle_reaction_remove(payload)
         
+    async def on_raw_member_remove(self, payload):
+        """Forget fetched members that left"""
+        self.member_resolver.invalidate(payload.guild_id, payload.user.id)
+        
+    async def on_guild_role_delete(self, role):
+        """Drop reaction roles that grant a deleted role"""
+        await self.config_manager.remove_role_mappings(role.guild.id, role.id)
+        
+    async def on_guild_channel_delete(self, channel):
+        """Drop reaction roles and the welcome message reference in a deleted channel"""
+        await self.config_manager.remove_channel_mappings(channel.guild.id, channel.id)
+        
+    async def on_raw_message_delete(self, payload):
+        """Drop reaction roles on a deleted message"""
+        if self.config_manager.is_tracked_message(payload.guild_id, payload.message_id):
+            await self.config_manager.remove_message_mappings(payload.guild_id, {payload.message_id})
+            
+    async def on_raw_bulk_message_delete(self, payload):
+        """Drop reaction roles on bulk-deleted messages"""
+        if any(self.config_manager.is_tracked_message(payload.guild_id, message_id)
+               for message_id in payload.message_ids):
+            await self.config_manager.remove_message_mappings(payload.guild_id, payload.message_ids)
+            
+    async def _set_nickname(self, guild):
+        """Set the bot's nickname in the main server"""
+        try:
+            await guild.me.edit(nick="大賢者")
+        except (discord.Forbidden, discord.HTTPException):
+            pass
+            
+    async def _chunk_guild(self, guild):
+        """Cache the members of a guild with reaction roles or a welcome message"""
+        if guild.chunked:
+            return
+        try:
+            await guild.chunk()
+            self.logger.debug(f"Chunked {guild.member_count} members of {guild.name}")
+        except Exception as e:
+            # One unreachable guild shouldn't hold back the reconciler for the rest
+            self.logger.error(f"Error chunking guild {guild.id}: {e}")
+        
+    async def _start_reconciler(self):
+        self.reconciler.start()
+        
+    async def _start_youtube_monitor(self):
+        """Start the YouTube polling loop; it runs for the life of the process"""
+        if not self.owns_guild(MAIN_GUILD_ID):
+            # In a cluster only the worker that can post the notifications polls
+            return
+        if self._youtube_task is None or self._youtube_task.done():
+            self._youtube_task = asyncio.create_task(self.youtube_monitor.start_monitoring())
+            
+    async def _config_consistency_loop(self):
+        """Run the full config consistency sweep once a day"""
+        await self.wait_until_ready()
+        while not self.is_closed():
+            # The event handlers cover normal deletions, so the first sweep waits a
+            # full interval rather than running while guilds may still be arriving
+            await asyncio.sleep(24 * 60 * 60)
+            try:
+                await self.config_manager.cleanup_invalid_configs(self)
+            except Exception as e:
+                self.logger.error(f"Error during config consistency check: {e}")
+        
     async def on_command_error(self, ctx, error):
         """Handle command errors"""
         if isinstance(error, commands.CommandNotFound):
@@ -115,89 +272,10 @@ class ReactionRoleBot(commands.Bot):
             await ctx.send("❌ An unexpected error occurred. Please try again later.")
     
     async def _send_welcome_message(self, guild):
-        """Send welcome message automatically to the first available channel"""
-        from commands import WelcomeView
-        
-        welcome_text = constants.WELCOME_TEXT
-        
-        # Check if we already have a stored welcome message
-        stored_welcome = await self.config_manager.get_welcome_message(guild.id)
-        if stored_welcome:
-            try:
-                # Try to get the existing message
-                channel = guild.get_channel(stored_welcome['channel_id'])
-                if channel:
-                    message = await channel.fetch_message(stored_welcome['message_id'])
-                    if (message.content == welcome_text and 
-                        message.components and 
-                        message.author == guild.me):
-                        # Message exists and is current, no need to send again
-                        self.logger.info(f"Welcome message already exists in {guild.name} #{channel.name}")
-                        return
-            except (discord.NotFound, discord.Forbidden):
-                # Message doesn't exist anymore, remove from config
-                await self.config_manager.remove_welcome_message(guild.id)
-        
-        # Find the first channel where bot can send messages
-        for channel in guild.text_channels:
-            if channel.permissions_for(guild.me).send_messages:
-                try:
-                    # Delete any old welcome messages in this channel
-                    async for message in channel.history(limit=50):
-                        if (message.author == guild.me and 
-                            message.content == welcome_text and 
-                            message.components):
-                            await message.delete()
-                            self.logger.info(f"Deleted old welcome message in {guild.name} #{channel.name}")
-                    
-                    # Send new welcome message
-                    view = WelcomeView(self)
-                    message = await channel.send(welcome_text, view=view)
-                    
-                    # Store the message reference
-                    await self.config_manager.set_welcome_message(guild.id, channel.id, message.id)
-                    
-                    self.logger.info(f"Automatically sent welcome message in {guild.name} #{channel.name}")
-                    break
-                    
-                except discord.Forbidden:
-                    continue
-                except Exception as e:
-                    self.logger.error(f"Error sending welcome message: {e}")
-                    continue
+        """Post the welcome message, or bring the existing one up to date"""
+        await self.welcome_messages.ensure(guild)
     
     async def _setup_custom_emoji(self, guild):
-        """Set up custom emoji for the welcome button"""
-        try:
-            emoji_name = "violette_unicorn"
-            existing_emoji = discord.utils.get(guild.emojis, name=emoji_name)
-            
-            # Always recreate the emoji to update it with the new image
-            if existing_emoji:
-                try:
-                    await existing_emoji.delete(reason="Updating emoji with new image")
-                    self.logger.info(f"Deleted old emoji {emoji_name} to update with new image")
-                except Exception as e:
-                    self.logger.warning(f"Could not delete old emoji: {e}")
-            
-            # Create the emoji with the new image
-            if guild.me.guild_permissions.manage_emojis:
-                try:
-                    with open('button_icon.png', 'rb') as image:
-                        emoji = await guild.create_custom_emoji(
-                            name=emoji_name,
-                            image=image.read(),
-                            reason="Welcome button icon - updated image"
-                        )
-                    self.custom_emoji = emoji
-                    self.logger.info(f"Created/updated custom emoji: {emoji_name}")
-                except Exception as e:
-                    self.logger.warning(f"Could not create custom emoji: {e}")
-                    self.custom_emoji = None
-            else:
-                self.logger.warning("No permission to manage emojis")
-                self.custom_emoji = None
-                
-        except Exception as e:
-            self.logger.error(f"Error setting up custom emoji: {e}")
-            self.custom_emoji = None
+        """Set up custom emoji for the welcome button, uploading only if the image changed"""
+        await self.asset_sync.sync_guild(guild)
+        self.custom_emoji = self.asset_sync.get_emoji(guild.id, 'violette_unicorn')
@@ -0,0 +1,262 @@
+"""
+Cluster mode: run the bot's shards across several worker processes.
+
+    python cluster.py launch --workers 2 --shards 4
+    python cluster.py send --guild 1288838226362105868 reload_config
+    python cluster.py send --guild 1288838226362105868 music stop
+
+The launcher spawns one `python main.py` per worker, each with its own range
+of shard IDs, and hosts a small IPC hub that routes commands to the worker
+owning a guild. Workers must share a per-guild config store (sqlite or
+sharded): every guild lives on exactly one shard, so each process only ever
+writes its own guilds.
+"""
+import os
+import sys
+import json
+import asyncio
+import logging
+import secrets
+import argparse
+from typing import Awaitable, Callable, Dict, List, Optional
+from discord.ext import commands
+from bot import ReactionRoleBot
+
+CLUSTER_BACKENDS = ('sqlite', 'sharded')
+MUSIC_ACTIONS = ('stop', 'pause', 'resume', 'skip')
+
+def shard_for_guild(guild_id: int, shard_count: int) -> int:
+    """Discord's guild -> shard mapping"""
+    return (guild_id >> 22) % shard_count
+
+async def _send_line(writer: asyncio.StreamWriter, message: Dict):
+    writer.write(json.dumps(message, separators=(',', ':')).encode('utf-8') + b'\n')
+    await writer.drain()
+
+class ShardedReactionRoleBot(ReactionRoleBot, commands.AutoShardedBot):
+    """
+    ReactionRoleBot on an AutoShardedBot. Without shard_ids it runs every
+    shard in this process; in cluster mode it runs the given range and talks
+    to the other workers through the launcher's IPC hub.
+    """
+
+    def __init__(self, shard_ids: Optional[List[int]] = None, shard_count: Optional[int] = None,
+                 ipc_address: Optional[str] = None, ipc_token: Optional[str] = None):
+        super().__init__(shard_ids=shard_ids, shard_count=shard_count)
+        self.ipc = ClusterIPCClient(ipc_address, ipc_token, shard_ids or [], self.handle_cluster_message) \
+            if ipc_address else None
+
+    def owns_guild(self, guild_id: int) -> bool:
+        if self.shard_ids is None or not self.shard_count:
+            return True
+        return shard_for_guild(guild_id, self.shard_count) in self.shard_ids
+
+    async def setup_hook(self):
+        await super().setup_hook()
+        if self.ipc:
+            self.ipc.start()
+
+    async def close(self):
+        if self.ipc:
+            await self.ipc.close()
+        await super().close()
+
+    async def handle_cluster_message(self, message: Dict):
+        """Cross-shard commands: config reloads and music control"""
+        op = message.get('op')
+        guild_id = message.get('guild_id')
+        if guild_id is None or not self.owns_guild(guild_id):
+            return
+        if op == 'reload_config':
+            await self.config_manager.reload_guild(guild_id)
+        elif op == 'music' and message.get('action') in MUSIC_ACTIONS:
+            await getattr(self.music_player, message['action'])(guild_id)
+        else:
+            self.logger.warning(f"Ignoring unknown cluster message: {message}")
+
+class ClusterIPCClient:
+    """Worker side of the IPC hub: newline-delimited JSON over a local TCP socket"""
+
+    def __init__(self, address: str, token: Optional[str], shard_ids: List[int],
+                 handler: Callable[[Dict], Awaitable[None]], reconnect_delay: float = 5.0):
+        host, port = address.rsplit(':', 1)
+        self.host, self.port = host, int(port)
+        self.token = token
+        self.shard_ids = shard_ids
+        self.handler = handler
+        self.reconnect_delay = reconnect_delay
+        self.logger = logging.getLogger(__name__)
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_connection(self.host, self.port)
+                await _send_line(self._writer, {'op': 'hello', 'token': self.token, 'shard_ids': self.shard_ids})
+                self.logger.info(f"Connected to cluster hub at {self.host}:{self.port}")
+                while line := await reader.readline():
+                    try:
+                        await self.handler(json.loads(line))
+                    except Exception as e:
+                        self.logger.error(f"Error handling cluster message: {e}")
+            except OSError as e:
+                self.logger.warning(f"Cluster hub unavailable: {e}")
+            self._writer = None
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def close(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+        if self._writer:
+            self._writer.close()
+
+class ClusterHub:
+    """Launcher side: routes messages to the worker that owns a guild's shard"""
+
+    def __init__(self, shard_count: int, token: str, host: str = '127.0.0.1', port: int = 0):
+        self.shard_count = shard_count
+        self.token = token
+        self.host = host
+        self.port = port
+        self.logger = logging.getLogger(__name__)
+        self._workers: Dict[int, asyncio.StreamWriter] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return f"{self.host}:{self.port}"
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        shard_ids = []
+        try:
+            hello = json.loads(await reader.readline() or b'{}')
+            if hello.get('op') != 'hello' or not secrets.compare_digest(str(hello.get('token')), self.token):
+                return
+            shard_ids = hello.get('shard_ids') or []
+            for shard_id in shard_ids:
+                self._workers[shard_id] = writer
+
+            while line := await reader.readline():
+                message = json.loads(line)
+                if message.get('op') != 'route':
+                    continue
+                target = self._workers.get(shard_for_guild(int(message['guild_id']), self.shard_count))
+                if target is None:
+                    self.logger.warning(f"No worker for guild {message['guild_id']}")
+                    continue
+                await _send_line(target, message['message'])
+        except (OSError, json.JSONDecodeError, KeyError, ValueError) as e:
+            self.logger.warning(f"Cluster connection error: {e}")
+        finally:
+            for shard_id in shard_ids:
+                if self._workers.get(shard_id) is writer:
+                    del self._workers[shard_id]
+            writer.close()
+
+    async def close(self):
+        for writer in set(self._workers.values()):
+            writer.close()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+def shard_ranges(shard_count: int, workers: int) -> List[List[int]]:
+    """Split shard IDs into contiguous, near-equal ranges"""
+    per_worker, extra = divmod(shard_count, workers)
+    ranges, start = [], 0
+    for index in range(workers):
+        size = per_worker + (1 if index < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return [r for r in ranges if r]
+
+async def run_worker(shard_ids: List[int], shard_count: int, address: str, token: str, restart_delay: float):
+    """Run one worker process, restarting it whenever it exits"""
+    logger = logging.getLogger(__name__)
+    env = dict(os.environ,
+               SHARD_IDS=','.join(map(str, shard_ids)),
+               SHARD_COUNT=str(shard_count),
+               CLUSTER_IPC=address,
+               CLUSTER_IPC_TOKEN=token,
+               CLUSTER_WORKER='1')
+    while True:
+        process = await asyncio.create_subprocess_exec(sys.executable, 'main.py', env=env)
+        logger.info(f"Started worker {process.pid} for shards {shard_ids}")
+        code = await process.wait()
+        logger.warning(f"Worker for shards {shard_ids} exited with {code}; restarting in {restart_delay}s")
+        await asyncio.sleep(restart_delay)
+
+async def launch(args):
+    backend = os.environ.setdefault('CONFIG_BACKEND', 'sqlite')
+    if backend not in CLUSTER_BACKENDS:
+        logging.error(f"Cluster mode needs a per-guild config store ({', '.join(CLUSTER_BACKENDS)}), not {backend}")
+        return 1
+
+    token = os.getenv('CLUSTER_IPC_TOKEN')
+    if not token:
+        token = secrets.token_hex(16)
+        logging.warning("CLUSTER_IPC_TOKEN not set; `cluster.py send` will not be able to reach this cluster")
+    hub = ClusterHub(args.shards, token, port=args.ipc_port)
+    address = await hub.start()
+    logging.info(f"Cluster hub listening on {address}")
+
+    # The workers skip the keep-alive server, so the launcher serves it once
+    from keepAlive import keepAlive
+    keepAlive()
+
+    try:
+        await asyncio.gather(*(run_worker(shard_ids, args.shards, address, token, args.restart_delay)
+                               for shard_ids in shard_ranges(args.shards, args.workers)))
+    finally:
+        await hub.close()
+    return 0
+
+async def send(args):
+    """Send one command to the worker that owns a guild"""
+    token = os.getenv('CLUSTER_IPC_TOKEN')
+    if not token:
+        logging.error("Set CLUSTER_IPC_TOKEN to the launcher's token")
+        return 1
+    if args.op == 'music':
+        if args.action not in MUSIC_ACTIONS:
+            logging.error(f"Music action must be one of {', '.join(MUSIC_ACTIONS)}")
+            return 1
+        message = {'op': 'music', 'action': args.action, 'guild_id': args.guild}
+    else:
+        message = {'op': 'reload_config', 'guild_id': args.guild}
+
+    reader, writer = await asyncio.open_connection('127.0.0.1', args.ipc_port)
+    await _send_line(writer, {'op': 'hello', 'token': token, 'shard_ids': []})
+    await _send_line(writer, {'op': 'route', 'guild_id': args.guild, 'message': message})
+    writer.close()
+    await writer.wait_closed()
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    launch_parser = subparsers.add_parser('launch', help="spawn the worker processes")
+    launch_parser.add_argument('--workers', type=int, default=2)
+    launch_parser.add_argument('--shards', type=int, required=True, help="total shard count")
+    launch_parser.add_argument('--ipc-port', type=int, default=int(os.getenv('CLUSTER_IPC_PORT', '8765')))
+    launch_parser.add_argument('--restart-delay', type=float, default=5.0)
+
+    send_parser = subparsers.add_parser('send', help="send a command to the worker owning a guild")
+    send_parser.add_argument('--guild', type=int, required=True)
+    send_parser.add_argument('--ipc-port', type=int, default=int(os.getenv('CLUSTER_IPC_PORT', '8765')))
+    send_parser.add_argument('op', choices=('reload_config', 'music'))
+    send_parser.add_argument('action', nargs='?')
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    return asyncio.run(launch(args) if args.command == 'launch' else send(args))
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,10 +2,13 @@ import discord
 from discord.ext import commands
 import logging
 import asyncio
-from utils import parse_emoji, get_role_by_name_or_id
+from utils import parse_emoji, get_role_by_name_or_id, parse_reaction_menu, load_reaction_menu_file
+from rate_limit import RatePacer
 
 async def setup_commands(bot):
     """Set up all bot commands"""
+    # Seed reactions share Discord's per-channel reaction bucket
+    reaction_pacer = RatePacer(interval=0.3)
     
     @bot.command(name='setup_reaction_role', aliases=['srr'])
     @commands.has_permissions(administrator=True)
@@ -43,6 +46,76 @@ async def setup_commands(bot):
         else:
             await ctx.send("❌ Already exists!")
     
+    @bot.command(name='setup_reaction_menu', aliases=['srm'])
+    @commands.has_permissions(administrator=True)
+    async def setup_reaction_menu(ctx, message_id: int, *, menu: str = ''):
+        """Set up many reaction roles at once: "emoji role, emoji role" or a JSON/YAML attachment."""
+        try:
+            if ctx.message.attachments:
+                attachment = ctx.message.attachments[0]
+                pairs = load_reaction_menu_file(await attachment.read(), attachment.filename)
+            else:
+                pairs = parse_reaction_menu(menu)
+        except ValueError as e:
+            await ctx.send(f"❌ Invalid menu: {e}")
+            return
+        
+        if not pairs:
+            await ctx.send("❌ Empty menu!")
+            return
+        
+        try:
+            message = await ctx.channel.fetch_message(message_id)
+        except discord.NotFound:
+            await ctx.send("❌ Message not found!")
+            return
+        except discord.Forbidden:
+            await ctx.send("❌ No permission to access that message!")
+            return
+        
+        # Validate every pair before anything is stored
+        errors = []
+        resolved = []
+        seen = set()
+        for emoji, role in pairs:
+            parsed_emoji = parse_emoji(emoji)
+            target_role = get_role_by_name_or_id(ctx.guild, role)
+            if not parsed_emoji:
+                errors.append(f"{emoji}: invalid emoji")
+            elif parsed_emoji in seen:
+                errors.append(f"{emoji}: listed twice")
+            elif not target_role or target_role >= ctx.guild.me.top_role:
+                errors.append(f"{emoji}: role `{role}` not found or too high")
+            else:
+                seen.add(parsed_emoji)
+                resolved.append((parsed_emoji, target_role.id))
+        
+        if errors:
+            await ctx.send("❌ Menu not saved:\n" + "\n".join(errors[:20]))
+            return
+        
+        added = await bot.config_manager.add_reaction_roles(
+            ctx.guild.id, ctx.channel.id, message_id, resolved
+        )
+        
+        already_seeded = {str(reaction.emoji) for reaction in message.reactions if reaction.me}
+        failed = 0
+        for emoji, _ in resolved:
+            if emoji in already_seeded:
+                continue
+            try:
+                await reaction_pacer.run(ctx.channel.id, lambda emoji=emoji: message.add_reaction(emoji))
+            except (discord.Forbidden, discord.HTTPException):
+                failed += 1
+        
+        skipped = len(resolved) - len(added)
+        summary = f"✅ Reaction menu set up: {len(added)} added"
+        if skipped:
+            summary += f", {skipped} already existed"
+        if failed:
+            summary += f", {failed} reactions could not be added"
+        await ctx.send(summary)
+    
     @bot.command(name='remove_reaction_role', aliases=['rrr'])
     @commands.has_permissions(administrator=True)
     async def remove_reaction_role(ctx, message_id: int, emoji: str):
@@ -99,6 +172,59 @@ async def setup_commands(bot):
         embed.add_field(name="Read Message History", value="✅" if perms.read_message_history else "❌")
         await ctx.send(embed=embed)
     
+    @bot.command(name='config_stats', aliases=['cs'])
+    @commands.has_permissions(administrator=True)
+    async def config_stats(ctx):
+        """Show config persistence statistics."""
+        stats = bot.config_manager.get_stats()
+        embed = discord.Embed(title=f"Config Storage ({stats.pop('backend')})", color=discord.Color.blue())
+        for name, value in stats.items():
+            if isinstance(value, bool):
+                value = "✅" if value else "❌"
+            elif name.endswith('latency'):
+                value = f"{value * 1000:.0f} ms"
+            embed.add_field(name=name.replace('_', ' ').title(), value=str(value))
+        await ctx.send(embed=embed)
+    
+    @bot.command(name='role_queue_stats', aliases=['rqs'])
+    @commands.has_permissions(administrator=True)
+    async def role_queue_stats(ctx):
+        """Show role update queue depth, wait times and rate limits for this server."""
+        stats = bot.role_scheduler.get_guild_stats(ctx.guild.id)
+        stats.update(bot.role_mutations.get_stats())
+        stats.update(bot.welcome_grants.get_stats())
+        stats['global_queue_depth'] = bot.role_scheduler.get_stats()['queue_depth']
+        embed = discord.Embed(title="Role Update Queue", color=discord.Color.blue())
+        for name, value in stats.items():
+            if name.endswith('wait') or name.startswith('time_to') or name == 'interval':
+                value = f"{value * 1000:.0f} ms"
+            embed.add_field(name=name.replace('_', ' ').title(), value=str(value))
+        await ctx.send(embed=embed)
+    
+    @bot.command(name='startup_status', aliases=['ss'])
+    @commands.has_permissions(administrator=True)
+    async def startup_status(ctx):
+        """Show which startup tasks have run, and any that failed."""
+        embed = discord.Embed(title="Startup Tasks", color=discord.Color.blue())
+        for name, status in bot.startup.get_status().items():
+            value = (f"{status['scope']} · ✅ {status['done']} · ⏳ {status['pending'] + status['running']}"
+                     f" · ❌ {status['failed']} · runs {status['runs']}")
+            if status['error']:
+                value += f"\n{status['error'][:200]}"
+            embed.add_field(name=name, value=value, inline=False)
+        await ctx.send(embed=embed)
+    
+    @bot.command(name='set_welcome_role', aliases=['swr'])
+    @commands.has_permissions(administrator=True)
+    async def set_welcome_role(ctx, *, role: str):
+        """Set the role the welcome button grants."""
+        role_obj = get_role_by_name_or_id(ctx.guild, role)
+        if not role_obj:
+            await ctx.send(f"❌ Role '{role}' not found!")
+            return
+        await bot.welcome_messages.set_role(ctx.guild.id, role_obj.id)
+        await ctx.send(f"✅ Welcome button now grants {role_obj.mention}!")
+    
     @bot.command(name='set_youtube_channel', aliases=['syc'])
     @commands.has_permissions(administrator=True)
     async def set_youtube_channel(ctx, *, channel_url_or_id: str):
@@ -118,6 +244,10 @@ async def setup_commands(bot):
         embed = discord.Embed(title="YouTube Status", color=discord.Color.blue())
         embed.add_field(name="API Key", value="✅" if api_key_set else "❌")
         embed.add_field(name="Channel", value=channel_id if channel_id else "❌ Not Set")
+        stats = bot.youtube_monitor.get_stats()
+        embed.add_field(name="Source", value=stats['source'])
+        embed.add_field(name="Polls", value=f"{stats['polls']} ({stats['not_modified']} unchanged)")
+        embed.add_field(name="Quota Used", value=str(stats['quota_units']))
         await ctx.send(embed=embed)
     
     @bot.command(name='join', aliases=['j'])
@@ -178,27 +308,9 @@ async def setup_commands(bot):
     @commands.has_permissions(administrator=True)
     async def welcome_message(ctx):
         """Send welcome message."""
-        from constants import WELCOME_TEXT
-        stored = await bot.config_manager.get_welcome_message(ctx.guild.id)
-        if stored:
-            try:
-                ch = ctx.guild.get_channel(stored['channel_id'])
-                msg = await ch.fetch_message(stored['message_id'])
-                await msg.delete()
-            except:
-                pass
-            await bot.config_manager.remove_welcome_message(ctx.guild.id)
-        
-        async for msg in ctx.channel.history(limit=50):
-            if msg.author == ctx.guild.me and msg.content == WELCOME_TEXT and msg.components:
-                try:
-                    await msg.delete()
-                except:
-                    pass
-        
-        view = WelcomeView(bot)
-        msg = await ctx.send(WELCOME_TEXT, view=view)
-        await bot.config_manager.set_welcome_message(ctx.guild.id, ctx.channel.id, msg.id)
+        if not await bot.welcome_messages.ensure(ctx.guild, channel=ctx.channel):
+            await ctx.send("❌ Could not send the welcome message here!")
+            return
         await ctx.send("✅ Welcome message sent!")
         try:
             await ctx.message.delete()
@@ -385,12 +497,17 @@ async def setup_commands(bot):
             await ctx.send(f"❌ No song found!")
     
     @setup_reaction_role.error
+    @setup_reaction_menu.error
     @remove_reaction_role.error
     @list_reaction_roles.error
     @test_permissions.error
+    @config_stats.error
+    @role_queue_stats.error
+    @startup_status.error
     @set_youtube_channel.error
     @youtube_status.error
     @welcome_message.error
+    @set_welcome_role.error
     async def command_error_handler(ctx, error):
         if isinstance(error, commands.MissingPermissions):
             await ctx.send("❌ Need Administrator permission!")
@@ -398,7 +515,12 @@ async def setup_commands(bot):
             logging.error(f"Error: {error}")
 
 
+# Stable custom_id so clicks on messages sent before a restart still reach the button
+WELCOME_BUTTON_ID = 'welcome:accept'
+
+
 class WelcomeView(discord.ui.View):
+    """Persistent view: registered with bot.add_view so buttons on old messages keep working"""
     def __init__(self, bot=None):
         super().__init__(timeout=None)
         emoji = '🦄'
@@ -409,14 +531,12 @@ class WelcomeView(discord.ui.View):
 
 class WelcomeButton(discord.ui.Button):
     def __init__(self, emoji):
-        super().__init__(label='同意入境', style=discord.ButtonStyle.primary, emoji=emoji)
+        super().__init__(label='同意入境', style=discord.ButtonStyle.primary, emoji=emoji,
+                         custom_id=WELCOME_BUTTON_ID)
     
     async def callback(self, interaction: discord.Interaction):
         """Handle button click."""
-        if interaction.guild.id == 1288838226362105868:
-            role = interaction.guild.get_role(1392004567524446218)
-        else:
-            role = discord.utils.get(interaction.guild.roles, name='聯邦住民')
+        role = await interaction.client.welcome_messages.get_role(interaction.guild)
         
         if not role:
             await interaction.response.send_message("❌ Role not found!", ephemeral=True)
@@ -434,8 +554,5 @@ class WelcomeButton(discord.ui.Button):
             await interaction.response.send_message("❌ Role too high!", ephemeral=True)
             return
         
-        try:
-            await interaction.user.add_roles(role)
-            await interaction.response.send_message("✅ Welcome!", ephemeral=True)
-        except Exception as e:
-            await interaction.response.send_message(f"❌ Error: {str(e)}", ephemeral=True)
+        # Queued at interactive priority; acknowledged early during click bursts
+        await interaction.client.welcome_grants.grant(interaction, role)
@@ -0,0 +1,146 @@
+import json
+import os
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List
+from config_records import json_default
+
+def apply_record(configs: Dict, record: Dict):
+    """
+    Apply one mutation record to a configs dict.
+    Records only set, delete or drop whole entries, so replaying a journal on
+    top of a snapshot that already contains some of its records is harmless.
+    """
+    op = record['op']
+    guild_key = record['guild']
+
+    if op == 'set':
+        configs.setdefault(guild_key, {})[record['key']] = record['value']
+    elif op == 'delete':
+        guild_config = configs.get(guild_key)
+        if guild_config is not None:
+            guild_config.pop(record['key'], None)
+            if not guild_config:
+                del configs[guild_key]
+    elif op == 'drop_guild':
+        configs.pop(guild_key, None)
+    else:
+        raise ValueError(f"Unknown journal op: {op}")
+
+def diff_configs(old: Dict, new: Dict) -> List[Dict]:
+    """Mutation records that turn old into new, touching only the entries that differ"""
+    records = []
+    for guild_key, old_guild in old.items():
+        new_guild = new.get(guild_key)
+        if new_guild is None:
+            records.append({'op': 'drop_guild', 'guild': guild_key})
+            continue
+        for key in old_guild.keys() - new_guild.keys():
+            records.append({'op': 'delete', 'guild': guild_key, 'key': key})
+
+    for guild_key, new_guild in new.items():
+        old_guild = old.get(guild_key, {})
+        for key, value in new_guild.items():
+            if old_guild.get(key) != value:
+                records.append({'op': 'set', 'guild': guild_key, 'key': key, 'value': value})
+    return records
+
+class ConfigJournal:
+    """Append-only JSONL journal of configuration mutations"""
+
+    def __init__(self, journal_file='config.journal'):
+        self.journal_file = journal_file
+        # Compaction moves the live journal here before writing the snapshot,
+        # so appends made while the snapshot is written are never truncated.
+        self.rotated_file = f"{journal_file}.1"
+        self.logger = logging.getLogger(__name__)
+        self._lock = asyncio.Lock()
+        self.records = 0
+
+    async def append(self, records: List[Dict]):
+        """Append records and fsync them; a crash can lose at most a partial last line"""
+        lines = ''.join(json.dumps(record, separators=(',', ':'), default=json_default) + '\n' for record in records)
+        async with self._lock:
+            await asyncio.to_thread(self._append_lines, lines)
+            self.records += len(records)
+
+    def _append_lines(self, lines: str):
+        with open(self.journal_file, 'a', encoding='utf-8') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def replay(self, configs: Dict) -> int:
+        """Replay the rotated and live journals onto configs, returning the record count"""
+        records = await asyncio.to_thread(self._read_records)
+        for record in records:
+            apply_record(configs, record)
+        self.records = len(records)
+        return len(records)
+
+    def _read_records(self) -> List[Dict]:
+        records = []
+        for path in (self.rotated_file, self.journal_file):
+            try:
+                with open(path, 'rb') as f:
+                    lines = f.readlines()
+            except FileNotFoundError:
+                continue
+
+            for line_number, line in enumerate(lines, 1):
+                try:
+                    if not line.endswith(b'\n'):
+                        raise json.JSONDecodeError("Missing record terminator", line.decode(errors='replace'), len(line))
+                    records.append(json.loads(line))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    if line_number == len(lines):
+                        # Torn write from a crash mid-append; cut it off so the
+                        # next append starts on a fresh line
+                        self.logger.warning(f"Dropping incomplete last record in {path}")
+                        os.truncate(path, sum(len(l) for l in lines[:-1]))
+                    else:
+                        self.logger.error(f"Skipping corrupt record at {path}:{line_number}")
+        return records
+
+    async def compact(self, take_snapshot: Callable[[], Any], write_snapshot: Callable[[Any], None]):
+        """
+        Fold the journal into a snapshot and discard the folded records.
+        write_snapshot runs in a thread, so the snapshot must not be modified
+        after take_snapshot returns it.
+        """
+        async with self._lock:
+            # No append can run while the snapshot is taken and the journal rotated
+            snapshot = take_snapshot()
+            folded = self.records
+            await asyncio.to_thread(self._rotate)
+            self.records = 0
+
+        try:
+            await asyncio.to_thread(write_snapshot, snapshot)
+        except Exception:
+            # The rotated journal is kept and replayed on the next load
+            self.records += folded
+            raise
+
+        await asyncio.to_thread(self._discard_rotated)
+        self.logger.debug(f"Compacted {folded} journal records into snapshot")
+
+    def _rotate(self):
+        if not os.path.exists(self.journal_file):
+            return
+        if os.path.exists(self.rotated_file):
+            # A previous compaction failed; keep its records ahead of ours
+            with open(self.journal_file, 'r', encoding='utf-8') as src, \
+                    open(self.rotated_file, 'a', encoding='utf-8') as dst:
+                dst.write(src.read())
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.remove(self.journal_file)
+        else:
+            os.replace(self.journal_file, self.rotated_file)
+
+    def _discard_rotated(self):
+        try:
+            os.remove(self.rotated_file)
+        except FileNotFoundError:
+            pass
@@ -1,44 +1,292 @@
-import json
+import os
+import time
 import asyncio
 import logging
-from typing import Optional, List, Dict
-import aiofiles
+from typing import Optional, List, Dict, Tuple, Set
+from config_journal import apply_record, diff_configs
+from config_records import ReactionRole, compact_configs
+from config_storage import ConfigStorage, JsonFileStorage, WELCOME_MESSAGE_KEY, is_reaction_key, reaction_key
+
+try:
+    import watchfiles
+except ImportError:  # Falls back to polling the file's mtime
+    watchfiles = None
 
 class ConfigManager:
-    """Manages persistent storage of reaction role configurations"""
+    """
+    Manages persistent storage of reaction role configurations.
+    self.configs is a copy-on-write snapshot: it and the guild dicts in it are
+    never modified once published. Writers build a new snapshot and swap it in,
+    so readers and storage backends serialising in a thread never see a
+    half-applied change.
+    """
     
-    def __init__(self, config_file='config.json'):
-        self.config_file = config_file
+    def __init__(self, storage: Optional[ConfigStorage] = None, idle_timeout: float = 1800.0):
+        self.storage = storage or JsonFileStorage()
         self.configs = {}
         self.logger = logging.getLogger(__name__)
-        self._lock = asyncio.Lock()
+        # Dispatch index for the reaction hot path. Message IDs are snowflakes,
+        # so (message_id, emoji) is unique without the guild/channel prefix.
+        self.configured_message_ids = frozenset()
+        self._reaction_index: Dict[Tuple[int, str], ReactionRole] = {}
+        # Reverse indexes (message/role/channel ID -> {(guild_key, config_key)})
+        # so deletions only touch the affected mappings
+        self._message_index: Dict[int, Set[Tuple[str, str]]] = {}
+        self._role_index: Dict[int, Set[Tuple[str, str]]] = {}
+        self._channel_index: Dict[int, Set[Tuple[str, str]]] = {}
+        # Lazy backends: guilds with stored config that are not in memory yet,
+        # and when each loaded guild was last touched (for idle eviction).
+        self._unloaded_guilds: Set[str] = set()
+        self._guild_last_used: Dict[str, float] = {}
+        self._load_lock = asyncio.Lock()
+        self._evictor: Optional[asyncio.Task] = None
+        self.idle_timeout = idle_timeout
+        self._watcher: Optional[asyncio.Task] = None
+        
+    @staticmethod
+    def _iter_mappings(guild_config: Dict):
+        """Yield (config_key, mapping) pairs, skipping non reaction-role entries"""
+        for config_key, config in guild_config.items():
+            if is_reaction_key(config_key):
+                yield config_key, config
+                
+    def _rebuild_index(self):
+        """Rebuild the dispatch and reverse indexes from the loaded configurations"""
+        self._reaction_index = {}
+        self._message_index = {}
+        self._role_index = {}
+        self._channel_index = {}
+        for guild_key, guild_config in self.configs.items():
+            for config_key, config in self._iter_mappings(guild_config):
+                self._index_add(guild_key, config_key, config, publish=False)
+        self.configured_message_ids = frozenset(self._message_index)
+        
+    def _index_add(self, guild_key: str, config_key: str, config: Dict, publish: bool = True):
+        """Add a mapping to the dispatch and reverse indexes"""
+        ref = (guild_key, config_key)
+        message_id = config['message_id']
+        self._reaction_index[(message_id, config['emoji'])] = config
+        self._message_index.setdefault(message_id, set()).add(ref)
+        self._role_index.setdefault(config['role_id'], set()).add(ref)
+        self._channel_index.setdefault(config['channel_id'], set()).add(ref)
+        if publish and message_id not in self.configured_message_ids:
+            self.configured_message_ids = self.configured_message_ids | {message_id}
+            
+    def _index_remove(self, guild_key: str, config_key: str, config: Dict, publish: bool = True):
+        """Remove a mapping from the dispatch and reverse indexes"""
+        ref = (guild_key, config_key)
+        message_id = config['message_id']
+        self._reaction_index.pop((message_id, config['emoji']), None)
+        for index, key in ((self._message_index, message_id),
+                           (self._role_index, config['role_id']),
+                           (self._channel_index, config['channel_id'])):
+            refs = index.get(key)
+            if refs is not None:
+                refs.discard(ref)
+                if not refs:
+                    del index[key]
+        if publish and message_id not in self._message_index:
+            self.configured_message_ids = self.configured_message_ids - {message_id}
+            
+    def _index_guild(self, guild_key: str, guild_config: Dict):
+        """Index every mapping of a freshly loaded guild"""
+        for config_key, config in self._iter_mappings(guild_config):
+            self._index_add(guild_key, config_key, config, publish=False)
+        self.configured_message_ids = frozenset(self._message_index)
+        
+    def _unindex_guild(self, guild_key: str, guild_config: Dict):
+        """Drop every mapping of an evicted guild from the indexes"""
+        for config_key, config in self._iter_mappings(guild_config):
+            self._index_remove(guild_key, config_key, config, publish=False)
+        self.configured_message_ids = frozenset(self._message_index)
+        
+    def has_guild_config(self, guild_id: int) -> bool:
+        """True if the guild has any stored configuration, loaded or not"""
+        guild_key = str(guild_id)
+        return guild_key in self.configs or guild_key in self._unloaded_guilds
+        
+    def is_guild_unloaded(self, guild_id: int) -> bool:
+        """True if the guild has stored config that has not been loaded yet"""
+        return bool(self._unloaded_guilds) and str(guild_id) in self._unloaded_guilds
+        
+    async def ensure_guild_loaded(self, guild_id: int):
+        """Load a guild's configuration on first use (lazy backends)"""
+        await self._ensure_loaded(str(guild_id))
+        
+    async def _ensure_loaded(self, guild_key: str):
+        if not self.storage.lazy:
+            return
+        self._guild_last_used[guild_key] = time.monotonic()
+        if guild_key not in self._unloaded_guilds:
+            return
+            
+        async with self._load_lock:
+            if guild_key not in self._unloaded_guilds:
+                return
+            guild_config = compact_configs({guild_key: await self.storage.load_guild(guild_key)})[guild_key]
+            self._unloaded_guilds.discard(guild_key)
+            if guild_config:
+                self.configs = {**self.configs, guild_key: guild_config}
+                self._index_guild(guild_key, guild_config)
+            self.logger.debug(f"Loaded configuration for guild {guild_key}")
+            
+    async def _evict_idle_guilds(self):
+        """Background task unloading guilds that have not been used for idle_timeout"""
+        while True:
+            await asyncio.sleep(self.idle_timeout / 2)
+            cutoff = time.monotonic() - self.idle_timeout
+            async with self._load_lock:
+                configs = dict(self.configs)
+                for guild_key, last_used in list(self._guild_last_used.items()):
+                    if last_used > cutoff:
+                        continue
+                    del self._guild_last_used[guild_key]
+                    guild_config = configs.pop(guild_key, None)
+                    if guild_config is None:
+                        continue
+                    # Lazy backends persist every mutation right away, so nothing is lost
+                    self._unindex_guild(guild_key, guild_config)
+                    self._unloaded_guilds.add(guild_key)
+                    self.logger.debug(f"Evicted idle configuration for guild {guild_key}")
+                self.configs = configs
+                    
+    def _commit(self, records: List[Dict]) -> List[Dict]:
+        """
+        Apply mutation records to a copy of the configs, keep the index in step
+        and publish the copy as the new snapshot. Only the outer dict and the
+        guild dicts the records touch are copied.
+        """
+        configs = dict(self.configs)
+        copied = set()
+        for record in records:
+            guild_key = record['guild']
+            if guild_key not in copied:
+                if guild_key in configs:
+                    configs[guild_key] = dict(configs[guild_key])
+                copied.add(guild_key)
+                
+            guild_config = configs.get(guild_key, {})
+            if record['op'] == 'drop_guild':
+                for config_key, config in self._iter_mappings(guild_config):
+                    self._index_remove(guild_key, config_key, config)
+            elif is_reaction_key(record['key']) and record['key'] in guild_config:
+                self._index_remove(guild_key, record['key'], guild_config[record['key']])
+                
+            apply_record(configs, record)
+            
+            if record['op'] == 'set' and is_reaction_key(record['key']):
+                self._index_add(guild_key, record['key'], record['value'])
+                
+        self.configs = configs
+        return records
+        
+    async def _persist(self, records: List[Dict]):
+        """Hand applied mutation records to the storage backend"""
+        if records:
+            await self.storage.persist(records, self.configs)
+            
+    def lookup_reaction(self, message_id: int, emoji_key: str) -> Optional[ReactionRole]:
+        """Synchronous O(1) lookup of the mapping for a reaction, if any"""
+        config = self._reaction_index.get((message_id, emoji_key))
+        if config is not None and self.storage.lazy:
+            self._guild_last_used[str(config['guild_id'])] = time.monotonic()
+        return config
         
     async def load_config(self):
-        """Load configurations from file"""
+        """Load configurations from the storage backend"""
+        # Mappings are held as ReactionRole records rather than 5-key dicts
+        self.configs = compact_configs(await self.storage.load())
+        self._rebuild_index()
+        
+        if self.storage.lazy:
+            self._unloaded_guilds = await self.storage.list_guilds() - set(self.configs)
+            self._guild_last_used = {}
+            if self._evictor is None or self._evictor.done():
+                self._evictor = asyncio.create_task(self._evict_idle_guilds())
+            
+    def start_watching(self, poll_interval: float = 2.0):
+        """Hot-reload edits made to the config file while the bot is running"""
+        if self.storage.watch_path is None:
+            return
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.create_task(self._watch_config_file(poll_interval))
+            
+    async def _watch_config_file(self, poll_interval: float):
+        """Background task reloading the config file whenever it changes"""
+        path = os.path.abspath(self.storage.watch_path)
+        if watchfiles is not None:
+            self.logger.info(f"Watching {path} for changes")
+            # Watch the directory: atomic saves replace the file, which would
+            # end a watch on the file itself
+            async for _ in watchfiles.awatch(os.path.dirname(path),
+                                             watch_filter=lambda change, changed: changed == path):
+                await self.reload_from_disk()
+        else:
+            self.logger.info(f"Polling {path} for changes every {poll_interval}s")
+            while True:
+                await asyncio.sleep(poll_interval)
+                await self.reload_from_disk()
+                
+    async def reload_from_disk(self) -> int:
+        """
+        Apply edits made to the stored config outside the bot, returning the
+        number of changed entries. Only the entries that differ are applied;
+        our own saves are recognised and skipped.
+        """
         try:
-            async with aiofiles.open(self.config_file, 'r') as f:
-                content = await f.read()
-                self.configs = json.loads(content)
-                self.logger.info(f"Loaded {len(self.configs)} guild configurations")
-        except FileNotFoundError:
-            self.logger.info("Config file not found, starting with empty configuration")
-            self.configs = {}
-        except json.JSONDecodeError:
-            self.logger.error("Invalid JSON in config file, starting with empty configuration")
-            self.configs = {}
+            records = await self.storage.read_changes()
         except Exception as e:
-            self.logger.error(f"Error loading config: {e}")
-            self.configs = {}
+            self.logger.error(f"Ignoring unreadable config file change: {e}")
+            return 0
+        if not records:
+            return 0
             
+        # Already on disk, so hand the new snapshot over without persisting it
+        self._commit(records)
+        self.storage.adopt(self.configs)
+        self.logger.info(f"Hot-reloaded {len(records)} configuration changes from {self.storage.watch_path}")
+        return len(records)
+        
+    async def reload_guild(self, guild_id: int) -> int:
+        """
+        Re-read one guild from storage after another process changed it,
+        applying only the entries that differ. Returns the number of changes.
+        """
+        guild_key = str(guild_id)
+        await self._ensure_loaded(guild_key)
+        try:
+            stored = compact_configs({guild_key: await self.storage.load_guild(guild_key)})
+        except NotImplementedError as e:
+            self.logger.warning(f"Cannot reload guild {guild_key}: {e}")
+            return 0
+        current = {guild_key: self.configs[guild_key]} if guild_key in self.configs else {}
+        records = diff_configs(current, {k: v for k, v in stored.items() if v})
+        if records:
+            # Already in storage, so nothing to persist
+            self._commit(records)
+            self.logger.info(f"Reloaded {len(records)} configuration changes for guild {guild_key}")
+        return len(records)
+        
     async def save_config(self):
-        """Save configurations to file"""
-        async with self._lock:
-            try:
-                async with aiofiles.open(self.config_file, 'w') as f:
-                    await f.write(json.dumps(self.configs, indent=2))
-                    self.logger.debug("Configuration saved to file")
-            except Exception as e:
-                self.logger.error(f"Error saving config: {e}")
+        """Write pending configuration changes immediately"""
+        await self.storage.flush()
+        
+    async def close(self):
+        """Flush pending changes and release the storage backend"""
+        for task in (self._evictor, self._watcher):
+            if task and not task.done():
+                task.cancel()
+        self._evictor = None
+        self._watcher = None
+        await self.storage.close()
+        
+    def get_stats(self) -> Dict:
+        """Persistence statistics for diagnostics"""
+        stats = self.storage.get_stats()
+        if self.storage.lazy:
+            stats['loaded_guilds'] = len(self.configs)
+            stats['unloaded_guilds'] = len(self._unloaded_guilds)
+        return stats
                 
     async def add_reaction_role(self, guild_id: int, channel_id: int, message_id: int, emoji: str, role_id: int) -> bool:
         """
@@ -46,33 +294,58 @@ class ConfigManager:
         Returns True if added, False if already exists.
         """
         guild_key = str(guild_id)
-        config_key = f"{channel_id}_{message_id}_{emoji}"
+        await self._ensure_loaded(guild_key)
+        config_key = reaction_key(channel_id, message_id, emoji)
         
-        if guild_key not in self.configs:
-            self.configs[guild_key] = {}
-            
-        if config_key in self.configs[guild_key]:
+        if config_key in self.configs.get(guild_key, {}):
             return False  # Already exists
             
-        self.configs[guild_key][config_key] = {
-            'guild_id': guild_id,
-            'channel_id': channel_id,
-            'message_id': message_id,
-            'emoji': emoji,
-            'role_id': role_id
-        }
+        records = self._commit([{
+            'op': 'set',
+            'guild': guild_key,
+            'key': config_key,
+            'value': ReactionRole(guild_id, channel_id, message_id, emoji, role_id)
+        }])
         
-        await self.save_config()
+        await self._persist(records)
         self.logger.info(f"Added reaction role config: {config_key} -> role {role_id}")
         return True
         
+    async def add_reaction_roles(self, guild_id: int, channel_id: int, message_id: int, pairs: List[Tuple[str, int]]) -> List[ReactionRole]:
+        """
+        Add several reaction role configurations for one message as a single
+        commit and storage write. Returns the added configs; pairs that
+        already exist are skipped.
+        """
+        guild_key = str(guild_id)
+        await self._ensure_loaded(guild_key)
+        existing = self.configs.get(guild_key, {})
+        
+        records = []
+        for emoji, role_id in pairs:
+            config_key = reaction_key(channel_id, message_id, emoji)
+            if config_key in existing:
+                continue
+            records.append({
+                'op': 'set',
+                'guild': guild_key,
+                'key': config_key,
+                'value': ReactionRole(guild_id, channel_id, message_id, emoji, role_id)
+            })
+            
+        if records:
+            await self._persist(self._commit(records))
+            self.logger.info(f"Added {len(records)} reaction role configs for message {message_id}")
+        return [record['value'] for record in records]
+        
     async def remove_reaction_role(self, guild_id: int, channel_id: int, message_id: int, emoji: str) -> bool:
         """
         Remove a reaction role configuration.
         Returns True if removed, False if not found.
         """
         guild_key = str(guild_id)
-        config_key = f"{channel_id}_{message_id}_{emoji}"
+        await self._ensure_loaded(guild_key)
+        config_key = reaction_key(channel_id, message_id, emoji)
         
         if guild_key not in self.configs:
             return False
@@ -80,112 +353,189 @@ class ConfigManager:
         if config_key not in self.configs[guild_key]:
             return False
             
-        del self.configs[guild_key][config_key]
+        # Empty guild configs are cleaned up along with their last entry
+        records = self._commit([{'op': 'delete', 'guild': guild_key, 'key': config_key}])
         
-        # Clean up empty guild configs
-        if not self.configs[guild_key]:
-            del self.configs[guild_key]
-            
-        await self.save_config()
+        await self._persist(records)
         self.logger.info(f"Removed reaction role config: {config_key}")
         return True
         
-    async def get_reaction_config(self, guild_id: int, channel_id: int, message_id: int, emoji: str) -> Optional[Dict]:
+    async def get_reaction_config(self, guild_id: int, channel_id: int, message_id: int, emoji: str) -> Optional[ReactionRole]:
         """Get a specific reaction role configuration"""
-        guild_key = str(guild_id)
-        config_key = f"{channel_id}_{message_id}_{emoji}"
-        
-        if guild_key not in self.configs:
+        await self._ensure_loaded(str(guild_id))
+        config = self.lookup_reaction(message_id, emoji)
+        if not config or config['guild_id'] != guild_id or config['channel_id'] != channel_id:
             return None
-            
-        return self.configs[guild_key].get(config_key)
+        return config
         
-    async def get_guild_configs(self, guild_id: int) -> List[Dict]:
+    async def get_guild_configs(self, guild_id: int) -> List[ReactionRole]:
         """Get all reaction role configurations for a guild"""
         guild_key = str(guild_id)
+        await self._ensure_loaded(guild_key)
         
         if guild_key not in self.configs:
             return []
             
-        return list(self.configs[guild_key].values())
+        return [config for _, config in self._iter_mappings(self.configs[guild_key])]
         
     async def cleanup_guild(self, guild_id: int):
         """Remove all configurations for a guild (when bot leaves)"""
         guild_key = str(guild_id)
+        await self._ensure_loaded(guild_key)
         
         if guild_key in self.configs:
-            del self.configs[guild_key]
-            await self.save_config()
+            records = self._commit([{'op': 'drop_guild', 'guild': guild_key}])
+            await self._persist(records)
             self.logger.info(f"Cleaned up configurations for guild {guild_id}")
             
+    async def _remove_refs(self, refs, reason: str) -> int:
+        """Delete the mappings behind a set of (guild_key, config_key) index refs"""
+        records = [{'op': 'delete', 'guild': guild_key, 'key': config_key} for guild_key, config_key in refs]
+        if records:
+            await self._persist(self._commit(records))
+            self.logger.info(f"Removed {len(records)} reaction role configs for {reason}")
+        return len(records)
+        
+    async def remove_role_mappings(self, guild_id: int, role_id: int) -> int:
+        """Remove every mapping that grants a deleted role"""
+        await self._ensure_loaded(str(guild_id))
+        return await self._remove_refs(set(self._role_index.get(role_id, ())), f"deleted role {role_id}")
+        
+    async def remove_channel_mappings(self, guild_id: int, channel_id: int) -> int:
+        """Remove every mapping and the welcome message reference in a deleted channel"""
+        guild_key = str(guild_id)
+        await self._ensure_loaded(guild_key)
+        welcome = self.configs.get(guild_key, {}).get(WELCOME_MESSAGE_KEY)
+        if welcome and welcome['channel_id'] == channel_id:
+            await self.remove_welcome_message(guild_id)
+        return await self._remove_refs(set(self._channel_index.get(channel_id, ())), f"deleted channel {channel_id}")
+        
+    def is_tracked_message(self, guild_id: Optional[int], message_id: int) -> bool:
+        """True if a message has reaction roles or is the guild's stored welcome message"""
+        if message_id in self.configured_message_ids:
+            return True
+        welcome = self.configs.get(str(guild_id), {}).get(WELCOME_MESSAGE_KEY)
+        return bool(welcome) and welcome['message_id'] == message_id
+        
+    async def remove_message_mappings(self, guild_id: int, message_ids) -> int:
+        """
+        Remove mappings and the welcome message reference for deleted messages.
+        Guilds that a lazy backend has not loaded are left to the consistency sweep.
+        """
+        guild_key = str(guild_id)
+        welcome = self.configs.get(guild_key, {}).get(WELCOME_MESSAGE_KEY)
+        if welcome and welcome['message_id'] in message_ids:
+            await self.remove_welcome_message(guild_id)
+            
+        refs = set()
+        for message_id in message_ids:
+            refs.update(self._message_index.get(message_id, ()))
+        return await self._remove_refs(refs, "deleted messages")
+        
     async def cleanup_invalid_configs(self, bot):
-        """Remove configurations for guilds/channels/roles that no longer exist"""
+        """
+        Remove configurations for guilds/channels/roles that no longer exist.
+        Deletions are normally applied incrementally from gateway events; this
+        full sweep is only a periodic consistency check.
+        """
+        # The consistency check needs every guild, including lazily unloaded
+        # ones, but only guilds on this process's shards can be checked
+        for guild_key in list(self._unloaded_guilds):
+            if bot.owns_guild(int(guild_key)):
+                await self._ensure_loaded(guild_key)
+            
+        records = []
         cleaned = 0
         
         for guild_key in list(self.configs.keys()):
             guild_id = int(guild_key)
+            if not bot.owns_guild(guild_id):
+                continue
             guild = bot.get_guild(guild_id)
             
             if not guild:
                 # Guild no longer exists
-                del self.configs[guild_key]
+                records.append({'op': 'drop_guild', 'guild': guild_key})
                 cleaned += 1
                 continue
+            if guild.unavailable or not guild.roles or not guild.channels:
+                # Outage or late GUILD_CREATE: missing channels/roles mean nothing yet
+                self.logger.debug(f"Skipping consistency check for unavailable guild {guild_key}")
+                continue
                 
-            # Check individual configs
-            for config_key in list(self.configs[guild_key].keys()):
-                config = self.configs[guild_key][config_key]
+            # Check each distinct channel and role once rather than per mapping
+            mappings = list(self._iter_mappings(self.configs[guild_key]))
+            missing_channels = {
+                channel_id for channel_id in {config['channel_id'] for _, config in mappings}
+                if not guild.get_channel(channel_id)
+            }
+            missing_roles = {
+                role_id for role_id in {config['role_id'] for _, config in mappings}
+                if not guild.get_role(role_id)
+            }
+            if not missing_channels and not missing_roles:
+                continue
                 
-                # Check if channel exists
-                channel = guild.get_channel(config['channel_id'])
-                if not channel:
-                    del self.configs[guild_key][config_key]
-                    cleaned += 1
-                    continue
-                    
-                # Check if role exists
-                role = guild.get_role(config['role_id'])
-                if not role:
-                    del self.configs[guild_key][config_key]
+            for config_key, config in mappings:
+                if config['channel_id'] in missing_channels or config['role_id'] in missing_roles:
+                    records.append({'op': 'delete', 'guild': guild_key, 'key': config_key})
                     cleaned += 1
-                    continue
-                    
-            # Clean up empty guild configs
-            if not self.configs[guild_key]:
-                del self.configs[guild_key]
                 
         if cleaned > 0:
-            await self.save_config()
+            await self._persist(self._commit(records))
             self.logger.info(f"Cleaned up {cleaned} invalid configurations")
     
-    async def set_welcome_message(self, guild_id: int, channel_id: int, message_id: int) -> bool:
-        """Store welcome message reference"""
-        async with self._lock:
-            guild_key = str(guild_id)
-            if guild_key not in self.configs:
-                self.configs[guild_key] = {}
-            
-            self.configs[guild_key]['welcome_message'] = {
-                'channel_id': channel_id,
-                'message_id': message_id
-            }
-            
-            await self.save_config()
-            return True
+    async def get_guild_setting(self, guild_id: int, key: str, default=None):
+        """Get a named per-guild setting"""
+        guild_key = str(guild_id)
+        await self._ensure_loaded(guild_key)
+        return self.configs.get(guild_key, {}).get(key, default)
+    
+    async def set_guild_setting(self, guild_id: int, key: str, value) -> bool:
+        """Store a named per-guild setting (any JSON-serialisable value)"""
+        if is_reaction_key(key):
+            raise ValueError(f"Setting names cannot start with a digit: {key}")
+        guild_key = str(guild_id)
+        await self._ensure_loaded(guild_key)
+        records = self._commit([{'op': 'set', 'guild': guild_key, 'key': key, 'value': value}])
+        await self._persist(records)
+        return True
+    
+    async def set_welcome_message(self, guild_id: int, channel_id: int, message_id: int,
+                                  fingerprint: Optional[str] = None) -> bool:
+        """Store welcome message reference, with a fingerprint of its content"""
+        guild_key = str(guild_id)
+        await self._ensure_loaded(guild_key)
+        value = {
+            'channel_id': channel_id,
+            'message_id': message_id
+        }
+        if fingerprint:
+            value['fingerprint'] = fingerprint
+        records = self._commit([{
+            'op': 'set',
+            'guild': guild_key,
+            'key': WELCOME_MESSAGE_KEY,
+            'value': value
+        }])
+        
+        await self._persist(records)
+        return True
     
     async def get_welcome_message(self, guild_id: int) -> Optional[Dict]:
         """Get welcome message reference"""
         guild_key = str(guild_id)
+        await self._ensure_loaded(guild_key)
         if guild_key in self.configs:
-            return self.configs[guild_key].get('welcome_message')
+            return self.configs[guild_key].get(WELCOME_MESSAGE_KEY)
         return None
     
     async def remove_welcome_message(self, guild_id: int) -> bool:
         """Remove welcome message reference"""
-        async with self._lock:
-            guild_key = str(guild_id)
-            if guild_key in self.configs and 'welcome_message' in self.configs[guild_key]:
-                del self.configs[guild_key]['welcome_message']
-                await self.save_config()
-                return True
+        guild_key = str(guild_id)
+        await self._ensure_loaded(guild_key)
+        if guild_key in self.configs and WELCOME_MESSAGE_KEY in self.configs[guild_key]:
+            records = self._commit([{'op': 'delete', 'guild': guild_key, 'key': WELCOME_MESSAGE_KEY}])
+            await self._persist(records)
+            return True
         return False
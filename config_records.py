@@ -0,0 +1,172 @@
+import sys
+import json
+import struct
+from array import array
+from typing import Dict
+
+def is_reaction_key(config_key: str) -> bool:
+    """Reaction role keys are "<channel>_<message>_<emoji>"; guild settings are named"""
+    return config_key[:1].isdigit()
+
+def reaction_key(channel_id: int, message_id: int, emoji: str) -> str:
+    """Build the config key of a reaction role mapping"""
+    return f"{channel_id}_{message_id}_{emoji}"
+
+class ReactionRole:
+    """
+    Compact, immutable-by-convention reaction role mapping.
+    Supports config['role_id'] style access so it can stand in for the
+    plain dicts the rest of the bot reads.
+    """
+
+    __slots__ = ('guild_id', 'channel_id', 'message_id', 'emoji', 'role_id')
+
+    def __init__(self, guild_id: int, channel_id: int, message_id: int, emoji: str, role_id: int):
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.message_id = message_id
+        # The same handful of emoji repeat across every menu
+        self.emoji = sys.intern(emoji)
+        self.role_id = role_id
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ReactionRole':
+        return cls(data['guild_id'], data['channel_id'], data['message_id'], data['emoji'], data['role_id'])
+
+    def to_dict(self) -> Dict:
+        return {
+            'guild_id': self.guild_id,
+            'channel_id': self.channel_id,
+            'message_id': self.message_id,
+            'emoji': self.emoji,
+            'role_id': self.role_id
+        }
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def __eq__(self, other):
+        if isinstance(other, ReactionRole):
+            return (self.message_id, self.emoji, self.role_id, self.channel_id, self.guild_id) == \
+                   (other.message_id, other.emoji, other.role_id, other.channel_id, other.guild_id)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((self.message_id, self.emoji))
+
+    def __repr__(self):
+        return (f"ReactionRole(guild_id={self.guild_id}, channel_id={self.channel_id}, "
+                f"message_id={self.message_id}, emoji={self.emoji!r}, role_id={self.role_id})")
+
+def json_default(obj):
+    """json.dumps hook writing ReactionRole records as plain dicts"""
+    if isinstance(obj, ReactionRole):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def compact_configs(configs: Dict) -> Dict:
+    """Replace mapping dicts with ReactionRole records, in place"""
+    for guild_config in configs.values():
+        for key, value in guild_config.items():
+            if is_reaction_key(key) and isinstance(value, dict):
+                guild_config[key] = ReactionRole.from_dict(value)
+    return configs
+
+# Binary snapshot layout (little endian):
+#   magic "RRCB", u16 version
+#   u32 emoji count, then per emoji: u16 length + UTF-8 bytes
+#   u32 mapping count, then five int64 columns of that length:
+#   guild_id, channel_id, message_id, emoji index, role_id
+#   u32 length + JSON of the remaining per-guild entries (welcome message, settings)
+BINARY_MAGIC = b'RRCB'
+BINARY_VERSION = 1
+_COLUMNS = ('guild_id', 'channel_id', 'message_id', 'emoji', 'role_id')
+
+def encode_binary(configs: Dict) -> bytes:
+    """Encode configs into the columnar binary snapshot format"""
+    emoji_ids: Dict[str, int] = {}
+    columns = [array('q') for _ in _COLUMNS]
+    extras = {}
+
+    for guild_key, guild_config in configs.items():
+        for key, value in guild_config.items():
+            if not is_reaction_key(key):
+                extras.setdefault(guild_key, {})[key] = value
+                continue
+            emoji_index = emoji_ids.setdefault(value['emoji'], len(emoji_ids))
+            columns[0].append(value['guild_id'])
+            columns[1].append(value['channel_id'])
+            columns[2].append(value['message_id'])
+            columns[3].append(emoji_index)
+            columns[4].append(value['role_id'])
+
+    parts = [BINARY_MAGIC, struct.pack('<H', BINARY_VERSION), struct.pack('<I', len(emoji_ids))]
+    for emoji in emoji_ids:
+        encoded = emoji.encode('utf-8')
+        parts.append(struct.pack('<H', len(encoded)))
+        parts.append(encoded)
+
+    parts.append(struct.pack('<I', len(columns[0])))
+    for column in columns:
+        if sys.byteorder != 'little':
+            column.byteswap()
+        parts.append(column.tobytes())
+
+    extras_json = json.dumps(extras, separators=(',', ':'), default=json_default).encode('utf-8')
+    parts.append(struct.pack('<I', len(extras_json)))
+    parts.append(extras_json)
+    return b''.join(parts)
+
+def decode_binary(data: bytes) -> Dict:
+    """Decode a binary snapshot straight into ReactionRole records"""
+    if data[:4] != BINARY_MAGIC:
+        raise ValueError("Not a binary config snapshot")
+    (version,) = struct.unpack_from('<H', data, 4)
+    if version != BINARY_VERSION:
+        raise ValueError(f"Unsupported binary config version {version}")
+
+    offset = 6
+    (emoji_count,) = struct.unpack_from('<I', data, offset)
+    offset += 4
+    emojis = []
+    for _ in range(emoji_count):
+        (length,) = struct.unpack_from('<H', data, offset)
+        offset += 2
+        emojis.append(sys.intern(data[offset:offset + length].decode('utf-8')))
+        offset += length
+
+    (count,) = struct.unpack_from('<I', data, offset)
+    offset += 4
+    columns = []
+    for _ in _COLUMNS:
+        column = array('q')
+        column.frombytes(data[offset:offset + count * 8])
+        if sys.byteorder != 'little':
+            column.byteswap()
+        columns.append(column)
+        offset += count * 8
+
+    configs: Dict[str, Dict] = {}
+    guild_keys: Dict[int, str] = {}
+    for guild_id, channel_id, message_id, emoji_index, role_id in zip(*columns):
+        guild_key = guild_keys.get(guild_id)
+        if guild_key is None:
+            guild_key = guild_keys[guild_id] = str(guild_id)
+            configs.setdefault(guild_key, {})
+        emoji = emojis[emoji_index]
+        configs[guild_key][reaction_key(channel_id, message_id, emoji)] = ReactionRole(
+            guild_id, channel_id, message_id, emoji, role_id
+        )
+
+    (extras_length,) = struct.unpack_from('<I', data, offset)
+    offset += 4
+    extras = json.loads(data[offset:offset + extras_length].decode('utf-8'))
+    for guild_key, entries in extras.items():
+        configs.setdefault(guild_key, {}).update(entries)
+    return configs
@@ -0,0 +1,719 @@
+import json
+import os
+import sys
+import time
+import sqlite3
+import asyncio
+import logging
+import argparse
+from abc import ABC, abstractmethod
+from typing import Optional, List, Dict, Set
+import aiofiles
+from config_journal import ConfigJournal, diff_configs
+from config_records import ReactionRole, is_reaction_key, reaction_key, json_default, compact_configs, encode_binary, decode_binary
+
+WELCOME_MESSAGE_KEY = 'welcome_message'
+
+class ConfigStorage(ABC):
+    """
+    Persistence backend for ConfigManager.
+    ConfigManager keeps the live configs in memory and hands every mutation to
+    the backend as a list of records (see config_journal.apply_record) together
+    with the configs they were applied to.
+    """
+
+    name = 'abstract'
+    # Lazy backends load nothing up front; ConfigManager pulls guilds in with
+    # load_guild on first use and may evict idle ones again.
+    lazy = False
+    # Single-file backends set this so ConfigManager can hot-reload edits
+    # made to the file while the bot is running.
+    watch_path: Optional[str] = None
+
+    @abstractmethod
+    async def load(self) -> Dict:
+        """Load all guild configurations"""
+
+    async def list_guilds(self) -> Set[str]:
+        """Guild keys that have stored configuration (lazy backends)"""
+        return set()
+
+    async def load_guild(self, guild_key: str) -> Dict:
+        """Load a single guild's configuration (lazy and per-guild backends)"""
+        raise NotImplementedError(f"{self.name} storage cannot load a single guild")
+
+    @abstractmethod
+    async def persist(self, records: List[Dict], configs: Dict):
+        """Persist mutation records already applied to configs"""
+
+    async def read_changes(self) -> List[Dict]:
+        """Records for edits made to the stored config by someone else (watch_path backends)"""
+        return []
+
+    def adopt(self, configs: Dict):
+        """Track a snapshot whose latest changes came from storage itself and need no write"""
+
+    async def flush(self):
+        """Write anything still pending"""
+
+    async def close(self):
+        """Flush and release resources"""
+        await self.flush()
+
+    def get_stats(self) -> Dict:
+        """Persistence statistics for diagnostics"""
+        return {'backend': self.name}
+
+class JsonFileStorage(ConfigStorage):
+    """Stores all guild configurations as one JSON snapshot file"""
+
+    name = 'json'
+
+    def __init__(self, config_file='config.json', write_behind=False, flush_delay=2.0, flush_threshold=25):
+        self.config_file = config_file
+        self.watch_path = config_file
+        self.logger = logging.getLogger(__name__)
+        self._lock = asyncio.Lock()
+        self._configs = {}
+        # What the file on disk holds as far as we know, and its (mtime, size)
+        # after our own last write, so hot reload can skip our own saves and
+        # diff external edits against the file rather than unflushed changes
+        self._disk_configs = {}
+        self._disk_stat = None
+        # Write-behind: mutations only mark the store dirty and a background
+        # flusher writes one snapshot per flush_delay window, or as soon as
+        # flush_threshold changes are pending.
+        self.write_behind = write_behind
+        self.flush_delay = flush_delay
+        self.flush_threshold = flush_threshold
+        self._pending_changes = 0
+        self._dirty_since = None
+        self._dirty = asyncio.Event()
+        self._flush_now = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        self._flushing: Optional[asyncio.Future] = None
+        self.stats = {
+            'flushes': 0,
+            'coalesced_writes': 0,
+            'last_flush_latency': 0.0,
+            'max_flush_latency': 0.0,
+            'external_reloads': 0
+        }
+
+    async def load(self) -> Dict:
+        self._disk_stat = await asyncio.to_thread(self._stat_file)
+        try:
+            async with aiofiles.open(self.config_file, 'r') as f:
+                content = await f.read()
+                configs = json.loads(content)
+                self.logger.info(f"Loaded {len(configs)} guild configurations")
+        except FileNotFoundError:
+            self.logger.info("Config file not found, starting with empty configuration")
+            configs = {}
+        except json.JSONDecodeError:
+            self.logger.error("Invalid JSON in config file, starting with empty configuration")
+            configs = {}
+        except Exception as e:
+            self.logger.error(f"Error loading config: {e}")
+            configs = {}
+        self._configs = self._disk_configs = configs
+        return configs
+
+    async def persist(self, records: List[Dict], configs: Dict):
+        self._configs = configs
+        if self.write_behind:
+            for _ in records:
+                self._mark_dirty()
+            return
+
+        async with self._lock:
+            await self._write_snapshot()
+
+    def _mark_dirty(self):
+        """Record a pending change and make sure the flusher is running"""
+        self._pending_changes += 1
+        if self._dirty_since is None:
+            self._dirty_since = time.monotonic()
+        self._dirty.set()
+        if self._pending_changes >= self.flush_threshold:
+            self._flush_now.set()
+
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        """Background task writing one snapshot per debounce window"""
+        while True:
+            await self._dirty.wait()
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), timeout=self.flush_delay)
+            except asyncio.TimeoutError:
+                pass
+            # Shielded: cancelling the loop must not abandon a snapshot still
+            # being written in its thread, so close() waits for it instead
+            self._flushing = asyncio.ensure_future(self.flush())
+            await asyncio.shield(self._flushing)
+
+    async def flush(self):
+        async with self._lock:
+            if not self._pending_changes:
+                return
+
+            pending, dirty_since = self._pending_changes, self._dirty_since
+            self._pending_changes = 0
+            self._dirty_since = None
+            self._dirty.clear()
+            self._flush_now.clear()
+
+            if not await self._write_snapshot():
+                # Keep the changes pending so the next window retries them
+                self._pending_changes += pending
+                self._dirty_since = dirty_since
+                self._dirty.set()
+                return
+
+            latency = time.monotonic() - dirty_since
+            self.stats['flushes'] += 1
+            self.stats['coalesced_writes'] += pending - 1
+            self.stats['last_flush_latency'] = latency
+            self.stats['max_flush_latency'] = max(self.stats['max_flush_latency'], latency)
+
+    async def close(self):
+        if self._flusher and not self._flusher.done():
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+        self._flusher = None
+        if self._flushing is not None:
+            await self._flushing
+            self._flushing = None
+        await self.flush()
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats, backend=self.name, pending_changes=self._pending_changes,
+                    write_behind=self.write_behind)
+
+    async def _write_snapshot(self) -> bool:
+        """Serialise the current snapshot in a thread and write it atomically"""
+        try:
+            # Snapshots are never modified once published, so the thread can
+            # serialise it while the event loop keeps handling events
+            await asyncio.to_thread(self._save_snapshot, self._configs)
+            self.logger.debug("Configuration saved to file")
+            return True
+        except Exception as e:
+            self.logger.error(f"Error saving config: {e}")
+            return False
+
+    async def read_changes(self) -> List[Dict]:
+        async with self._lock:
+            # Holding the lock keeps our own flushes from racing the stat check
+            result = await asyncio.to_thread(self._read_external)
+            if result is None:
+                return []
+            stat, configs = result
+            records = diff_configs(self._disk_configs, configs)
+            self._disk_configs, self._disk_stat = configs, stat
+        if records:
+            self.stats['external_reloads'] += 1
+        return records
+
+    def adopt(self, configs: Dict):
+        # External edits are applied on top of unflushed changes, so the next
+        # flush writes both
+        self._configs = configs
+
+    def _read_external(self):
+        """Parse the config file if it changed since we last read or wrote it"""
+        stat = self._stat_file()
+        if stat is None or stat == self._disk_stat:
+            return None
+        with open(self.config_file, 'rb') as f:
+            data = f.read()
+        try:
+            return stat, compact_configs(self._parse(data))
+        except Exception:
+            # Half-saved edit; don't parse it again until the file changes
+            self._disk_stat = stat
+            raise
+
+    def _stat_file(self):
+        try:
+            st = os.stat(self.config_file)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _parse(self, data: bytes) -> Dict:
+        return json.loads(data)
+
+    def _save_snapshot(self, snapshot: Dict):
+        self._write_atomic(json.dumps(snapshot, indent=2, default=json_default))
+        self._disk_configs = snapshot
+
+    def _write_atomic(self, content):
+        """Write to a temp file, fsync it and rename it over the config file"""
+        tmp_file = f"{self.config_file}.tmp"
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        with open(tmp_file, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.config_file)
+        self._disk_stat = self._stat_file()
+
+class JournalStorage(JsonFileStorage):
+    """
+    JSON snapshot plus an append-only journal.
+    Every mutation is appended to the journal right away and the write-behind
+    flusher becomes the compactor folding the journal into the snapshot.
+    """
+
+    name = 'journal'
+
+    def __init__(self, config_file='config.json', journal_file='config.journal',
+                 compact_interval=300.0, compact_threshold=1000):
+        super().__init__(config_file, write_behind=True, flush_delay=compact_interval,
+                         flush_threshold=compact_threshold)
+        self.journal = ConfigJournal(journal_file)
+        # The journal, not the snapshot file, is the source of truth here
+        self.watch_path = None
+
+    async def load(self) -> Dict:
+        configs = await super().load()
+        replayed = await self.journal.replay(configs)
+        if replayed:
+            self.logger.info(f"Replayed {replayed} config journal records")
+            self._mark_dirty()
+        return configs
+
+    async def persist(self, records: List[Dict], configs: Dict):
+        self._configs = configs
+        try:
+            await self.journal.append(records)
+        except Exception as e:
+            self.logger.error(f"Error appending to config journal: {e}")
+        for _ in records:
+            self._mark_dirty()
+
+    def get_stats(self) -> Dict:
+        return dict(super().get_stats(), journal_records=self.journal.records)
+
+    async def _write_snapshot(self) -> bool:
+        try:
+            await self.journal.compact(lambda: self._configs, self._save_snapshot)
+            self.logger.debug("Configuration journal compacted")
+            return True
+        except Exception as e:
+            self.logger.error(f"Error compacting config journal: {e}")
+            return False
+
+class BinarySnapshotStorage(JsonFileStorage):
+    """
+    Same write-behind snapshot store as JsonFileStorage, but in the columnar
+    binary format from config_records, which loads straight into
+    ReactionRole records without building a dict per mapping.
+    """
+
+    name = 'binary'
+
+    def __init__(self, config_file='config.bin', write_behind=False, flush_delay=2.0, flush_threshold=25):
+        super().__init__(config_file, write_behind, flush_delay, flush_threshold)
+
+    async def load(self) -> Dict:
+        self._disk_stat = await asyncio.to_thread(self._stat_file)
+        try:
+            async with aiofiles.open(self.config_file, 'rb') as f:
+                data = await f.read()
+            configs = await asyncio.to_thread(decode_binary, data)
+            self.logger.info(f"Loaded {len(configs)} guild configurations")
+        except FileNotFoundError:
+            self.logger.info("Config file not found, starting with empty configuration")
+            configs = {}
+        except Exception as e:
+            self.logger.error(f"Error loading binary config: {e}")
+            configs = {}
+        self._configs = self._disk_configs = configs
+        return configs
+
+    def _parse(self, data: bytes) -> Dict:
+        return decode_binary(data)
+
+    def _save_snapshot(self, snapshot: Dict):
+        self._write_atomic(encode_binary(snapshot))
+        self._disk_configs = snapshot
+
+class ShardedJsonStorage(ConfigStorage):
+    """
+    One JSON file per guild (configs/<guild_id>.json), loaded on demand.
+    A save only rewrites the files of the guilds it touched.
+    """
+
+    name = 'sharded'
+    lazy = True
+
+    def __init__(self, directory='configs'):
+        self.directory = directory
+        self.logger = logging.getLogger(__name__)
+        self._lock = asyncio.Lock()
+        self.stats = {
+            'guild_loads': 0,
+            'guild_writes': 0,
+            'last_write_latency': 0.0,
+            'max_write_latency': 0.0
+        }
+
+    def _guild_file(self, guild_key: str) -> str:
+        return os.path.join(self.directory, f"{guild_key}.json")
+
+    async def load(self) -> Dict:
+        return {}
+
+    async def list_guilds(self) -> Set[str]:
+        try:
+            names = await asyncio.to_thread(os.listdir, self.directory)
+        except FileNotFoundError:
+            return set()
+        guild_keys = {name[:-5] for name in names if name.endswith('.json') and name[:-5].isdigit()}
+        self.logger.info(f"Found {len(guild_keys)} guild configuration files in {self.directory}")
+        return guild_keys
+
+    async def load_guild(self, guild_key: str) -> Dict:
+        try:
+            async with aiofiles.open(self._guild_file(guild_key), 'r') as f:
+                guild_config = json.loads(await f.read())
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError:
+            self.logger.error(f"Invalid JSON in config file for guild {guild_key}")
+            return {}
+        self.stats['guild_loads'] += 1
+        return guild_config
+
+    async def persist(self, records: List[Dict], configs: Dict):
+        guild_keys = {record['guild'] for record in records}
+        start = time.monotonic()
+        async with self._lock:
+            for guild_key in guild_keys:
+                guild_config = configs.get(guild_key)
+                try:
+                    if guild_config:
+                        await asyncio.to_thread(self._save_guild, guild_key, guild_config)
+                    else:
+                        await asyncio.to_thread(self._remove, self._guild_file(guild_key))
+                except Exception as e:
+                    self.logger.error(f"Error saving config for guild {guild_key}: {e}")
+                    continue
+                self.stats['guild_writes'] += 1
+
+        latency = time.monotonic() - start
+        self.stats['last_write_latency'] = latency
+        self.stats['max_write_latency'] = max(self.stats['max_write_latency'], latency)
+
+    def _save_guild(self, guild_key: str, guild_config: Dict):
+        self._write_atomic(self._guild_file(guild_key), json.dumps(guild_config, indent=2, default=json_default))
+
+    def _write_atomic(self, path: str, content: str):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_file = f"{path}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats, backend=self.name)
+
+class SQLiteStorage(ConfigStorage):
+    """
+    Stores configurations in indexed SQLite tables (WAL mode).
+    Each mutation batch is one small transaction instead of a full rewrite,
+    and guilds are read on first use through the guild_id indexes.
+    """
+
+    name = 'sqlite'
+    lazy = True
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS reaction_roles (
+            guild_id INTEGER NOT NULL,
+            channel_id INTEGER NOT NULL,
+            message_id INTEGER NOT NULL,
+            emoji TEXT NOT NULL,
+            role_id INTEGER NOT NULL,
+            PRIMARY KEY (channel_id, message_id, emoji)
+        );
+        CREATE INDEX IF NOT EXISTS idx_reaction_roles_guild ON reaction_roles (guild_id);
+        CREATE INDEX IF NOT EXISTS idx_reaction_roles_message ON reaction_roles (message_id);
+        CREATE INDEX IF NOT EXISTS idx_reaction_roles_role ON reaction_roles (guild_id, role_id);
+        CREATE TABLE IF NOT EXISTS welcome_messages (
+            guild_id INTEGER PRIMARY KEY,
+            channel_id INTEGER NOT NULL,
+            message_id INTEGER NOT NULL,
+            fingerprint TEXT
+        );
+        CREATE TABLE IF NOT EXISTS guild_settings (
+            guild_id INTEGER NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (guild_id, key)
+        );
+    """
+
+    def __init__(self, db_file='config.db'):
+        self.db_file = db_file
+        self.logger = logging.getLogger(__name__)
+        self._lock = asyncio.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.stats = {
+            'guild_loads': 0,
+            'transactions': 0,
+            'records_written': 0,
+            'last_write_latency': 0.0,
+            'max_write_latency': 0.0
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(self.SCHEMA)
+            # Databases created before welcome message fingerprints
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(welcome_messages)")}
+            if 'fingerprint' not in columns:
+                self._conn.execute("ALTER TABLE welcome_messages ADD COLUMN fingerprint TEXT")
+        return self._conn
+
+    async def load(self) -> Dict:
+        return {}
+
+    async def list_guilds(self) -> Set[str]:
+        async with self._lock:
+            try:
+                guild_ids = await asyncio.to_thread(self._list_guilds_sync)
+            except sqlite3.Error as e:
+                self.logger.error(f"Error reading config database: {e}")
+                return set()
+        self.logger.info(f"Found {len(guild_ids)} guild configurations in {self.db_file}")
+        return {str(guild_id) for guild_id in guild_ids}
+
+    def _list_guilds_sync(self) -> Set[int]:
+        conn = self._connect()
+        # Each table's guild_id index or primary key answers this without a table scan
+        rows = conn.execute("SELECT DISTINCT guild_id FROM reaction_roles "
+                            "UNION SELECT guild_id FROM welcome_messages "
+                            "UNION SELECT DISTINCT guild_id FROM guild_settings")
+        return {guild_id for (guild_id,) in rows}
+
+    async def load_guild(self, guild_key: str) -> Dict:
+        async with self._lock:
+            try:
+                guild_config = await asyncio.to_thread(self._load_sync, int(guild_key))
+            except sqlite3.Error as e:
+                self.logger.error(f"Error loading config for guild {guild_key}: {e}")
+                return {}
+        self.stats['guild_loads'] += 1
+        return guild_config
+
+    def _load_sync(self, guild_id: int) -> Dict:
+        conn = self._connect()
+        guild_config = {}
+        # Every table is keyed by guild first, so one guild is an index range
+        for channel_id, message_id, emoji, role_id in conn.execute(
+                "SELECT channel_id, message_id, emoji, role_id FROM reaction_roles WHERE guild_id = ?", (guild_id,)):
+            guild_config[reaction_key(channel_id, message_id, emoji)] = ReactionRole(
+                guild_id, channel_id, message_id, emoji, role_id
+            )
+        for channel_id, message_id, fingerprint in conn.execute(
+                "SELECT channel_id, message_id, fingerprint FROM welcome_messages WHERE guild_id = ?", (guild_id,)):
+            welcome = {
+                'channel_id': channel_id,
+                'message_id': message_id
+            }
+            if fingerprint:
+                welcome['fingerprint'] = fingerprint
+            guild_config[WELCOME_MESSAGE_KEY] = welcome
+        for key, value in conn.execute("SELECT key, value FROM guild_settings WHERE guild_id = ?", (guild_id,)):
+            guild_config[key] = json.loads(value)
+        return guild_config
+
+    async def persist(self, records: List[Dict], configs: Dict):
+        if not records:
+            return
+        start = time.monotonic()
+        async with self._lock:
+            try:
+                await asyncio.to_thread(self._write_records, records)
+            except sqlite3.Error as e:
+                self.logger.error(f"Error writing config database: {e}")
+                return
+
+        latency = time.monotonic() - start
+        self.stats['transactions'] += 1
+        self.stats['records_written'] += len(records)
+        self.stats['last_write_latency'] = latency
+        self.stats['max_write_latency'] = max(self.stats['max_write_latency'], latency)
+
+    def _write_records(self, records: List[Dict]):
+        conn = self._connect()
+        with conn:
+            for record in records:
+                self._write_record(conn, record)
+
+    def _write_record(self, conn: sqlite3.Connection, record: Dict):
+        op = record['op']
+        guild_id = int(record['guild'])
+
+        if op == 'drop_guild':
+            for table in ('reaction_roles', 'welcome_messages', 'guild_settings'):
+                conn.execute(f"DELETE FROM {table} WHERE guild_id = ?", (guild_id,))
+            return
+
+        key = record['key']
+        if op == 'set':
+            value = record['value']
+            if is_reaction_key(key):
+                conn.execute(
+                    "INSERT OR REPLACE INTO reaction_roles (guild_id, channel_id, message_id, emoji, role_id) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (guild_id, value['channel_id'], value['message_id'], value['emoji'], value['role_id'])
+                )
+            elif key == WELCOME_MESSAGE_KEY:
+                conn.execute(
+                    "INSERT OR REPLACE INTO welcome_messages (guild_id, channel_id, message_id, fingerprint) "
+                    "VALUES (?, ?, ?, ?)",
+                    (guild_id, value['channel_id'], value['message_id'], value.get('fingerprint'))
+                )
+            else:
+                conn.execute(
+                    "INSERT OR REPLACE INTO guild_settings (guild_id, key, value) VALUES (?, ?, ?)",
+                    (guild_id, key, json.dumps(value, default=json_default))
+                )
+        elif op == 'delete':
+            if is_reaction_key(key):
+                # IDs never contain underscores, so the emoji is everything after the second one
+                channel_id, message_id, emoji = key.split('_', 2)
+                conn.execute(
+                    "DELETE FROM reaction_roles WHERE channel_id = ? AND message_id = ? AND emoji = ?",
+                    (int(channel_id), int(message_id), emoji)
+                )
+            elif key == WELCOME_MESSAGE_KEY:
+                conn.execute("DELETE FROM welcome_messages WHERE guild_id = ?", (guild_id,))
+            else:
+                conn.execute("DELETE FROM guild_settings WHERE guild_id = ? AND key = ?", (guild_id, key))
+        else:
+            raise ValueError(f"Unknown config op: {op}")
+
+    async def import_configs(self, configs: Dict):
+        """Replace the database contents with configs in a single transaction"""
+        records = [
+            {'op': 'set', 'guild': guild_key, 'key': key, 'value': value}
+            for guild_key, guild_config in configs.items()
+            for key, value in guild_config.items()
+        ]
+        async with self._lock:
+            await asyncio.to_thread(self._import_sync, records)
+
+    def _import_sync(self, records: List[Dict]):
+        conn = self._connect()
+        with conn:
+            for table in ('reaction_roles', 'welcome_messages', 'guild_settings'):
+                conn.execute(f"DELETE FROM {table}")
+            for record in records:
+                self._write_record(conn, record)
+
+    async def close(self):
+        async with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats, backend=self.name)
+
+def create_storage(backend: str = 'json', **options) -> ConfigStorage:
+    """Build a storage backend by name ('json', 'journal', 'sqlite', 'sharded' or 'binary')"""
+    if backend == 'json':
+        return JsonFileStorage(**options)
+    if backend == 'journal':
+        return JournalStorage(**options)
+    if backend == 'sqlite':
+        return SQLiteStorage(**options)
+    if backend == 'sharded':
+        return ShardedJsonStorage(**options)
+    if backend == 'binary':
+        return BinarySnapshotStorage(**options)
+    raise ValueError(f"Unknown config backend: {backend}")
+
+async def migrate_json_to_sqlite(config_file: str, db_file: str, journal_file: Optional[str] = None) -> int:
+    """Import a config.json (and its journal, if any) into a SQLite database"""
+    if journal_file:
+        source = JournalStorage(config_file, journal_file)
+    else:
+        source = JsonFileStorage(config_file)
+    configs = await source.load()
+
+    target = SQLiteStorage(db_file)
+    await target.import_configs(configs)
+    await target.close()
+    return sum(1 for guild_config in configs.values() for key in guild_config if is_reaction_key(key))
+
+async def split_json_into_shards(config_file: str, directory: str) -> int:
+    """Write one per-guild file for every guild in a config.json"""
+    configs = await JsonFileStorage(config_file).load()
+    records = [{'op': 'set', 'guild': guild_key} for guild_key in configs]
+    await ShardedJsonStorage(directory).persist(records, configs)
+    return len(configs)
+
+async def convert_json_to_binary(config_file: str, binary_file: str) -> int:
+    """Write a binary snapshot of a config.json"""
+    configs = await JsonFileStorage(config_file).load()
+    target = BinarySnapshotStorage(binary_file)
+    await asyncio.to_thread(target._save_snapshot, configs)
+    return len(configs)
+
+def main(argv=None):
+    """Command line entry point: python config_storage.py migrate config.json config.db"""
+    parser = argparse.ArgumentParser(description="Config storage maintenance")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    migrate = subparsers.add_parser('migrate', help="Import a JSON config file into SQLite")
+    migrate.add_argument('config_file', nargs='?', default='config.json')
+    migrate.add_argument('db_file', nargs='?', default='config.db')
+    migrate.add_argument('--journal', help="Journal file to replay on top of the JSON snapshot")
+    shard = subparsers.add_parser('shard', help="Split a JSON config file into per-guild files")
+    shard.add_argument('config_file', nargs='?', default='config.json')
+    shard.add_argument('directory', nargs='?', default='configs')
+    binary = subparsers.add_parser('binary', help="Convert a JSON config file into a binary snapshot")
+    binary.add_argument('config_file', nargs='?', default='config.json')
+    binary.add_argument('binary_file', nargs='?', default='config.bin')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.command == 'binary':
+        count = asyncio.run(convert_json_to_binary(args.config_file, args.binary_file))
+        print(f"Wrote {count} guild configurations into {args.binary_file}")
+        return 0
+
+    if args.command == 'shard':
+        count = asyncio.run(split_json_into_shards(args.config_file, args.directory))
+        print(f"Wrote {count} guild configuration files into {args.directory}")
+        return 0
+
+    count = asyncio.run(migrate_json_to_sqlite(args.config_file, args.db_file, args.journal))
+    print(f"Imported {count} reaction role mappings into {args.db_file}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
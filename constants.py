@@ -1,2 +1,14 @@
 # constants.py
-WELCOME_TEXT = "歡迎來到澪夜聯邦！為了讓每一個人在這裏都可以玩得開心，請遵守聯邦法規：\nWelcome to Miya Federation! To ensure everyone can have fun here, please follow the Federation Regulations:\n\n----------------------------------------------------------------------------------------------------------------------------\n\n聯邦法規第一條：嚴禁不雅、歧視等用語和無視他人感受。\nFederation Regulation Article 1: Inappropriate, discriminatory language and disregarding others' feelings are strictly prohibited.\n\n聯邦法規第二條：保持友善與尊重，請勿攻擊或騷擾其他成員。\nFederation Regulation Article 2: Maintain friendliness and respect, do not attack or harass other members.\n\n聯邦法規第三條：尊重別人私隱，不要隨便冒犯他人，主要是我自己。\n\nFederation Regulation Article 3: Respect others' privacy, do not offend others casually, especially myself.\n\n聯邦法規第四條：請勿分享未經授權的內容，使用前請先獲得允許。\nFederation Regulation Article 4: Do not share unauthorized content, please obtain permission before use.\n\n聯邦法規第五條：禁止惡意刷屏，保持聊天環境清新整潔。\nFederation Regulation Article 5: Malicious spamming is prohibited, keep the chat environment clean and tidy.\n\n聯邦法規第六條：不要散布謠言，保持信息真實性。\nFederation Regulation Article 6: Do not spread rumors, maintain information authenticity.\n\n----------------------------------------------------------------------------------------------------------------------------\n\n特殊身份及權力：\nSpecial Roles and Powers:\n\n史萊姆分身----MOD的存在，擁有萬人之上的權力。\nSlime Avatars----MOD existence, possessing power above all.\nADHD過動兒們----聯邦成立之初的成員，有最優先意見權。\nADHD Hyperactive Kids----Members from the founding of the Federation, have priority opinion rights.\n\n希望大家在這裡都能玩得愉快，並保持良好的聯邦環境！\nWe hope everyone can have fun here and maintain a good Federation environment!"
\ No newline at end of file
+WELCOME_TEXT = "歡迎來到澪夜聯邦！為了讓每一個人在這裏都可以玩得開心，請遵守聯邦法規：\nWelcome to Miya Federation! To ensure everyone can have fun here, please follow the Federation Regulations:\n\n----------------------------------------------------------------------------------------------------------------------------\n\n聯邦法規第一條：嚴禁不雅、歧視等用語和無視他人感受。\nFederation Regulation Article 1: Inappropriate, discriminatory language and disregarding others' feelings are strictly prohibited.\n\n聯邦法規第二條：保持友善與尊重，請勿攻擊或騷擾其他成員。\nFederation Regulation Article 2: Maintain friendliness and respect, do not attack or harass other members.\n\n聯邦法規第三條：尊重別人私隱，不要隨便冒犯他人，主要是我自己。\n\nFederation Regulation Article 3: Respect others' privacy, do not offend others casually, especially myself.\n\n聯邦法規第四條：請勿分享未經授權的內容，使用前請先獲得允許。\nFederation Regulation Article 4: Do not share unauthorized content, please obtain permission before use.\n\n聯邦法規第五條：禁止惡意刷屏，保持聊天環境清新整潔。\nFederation Regulation Article 5: Malicious spamming is prohibited, keep the chat environment clean and tidy.\n\n聯邦法規第六條：不要散布謠言，保持信息真實性。\nFederation Regulation Article 6: Do not spread rumors, maintain information authenticity.\n\n----------------------------------------------------------------------------------------------------------------------------\n\n特殊身份及權力：\nSpecial Roles and Powers:\n\n史萊姆分身----MOD的存在，擁有萬人之上的權力。\nSlime Avatars----MOD existence, possessing power above all.\nADHD過動兒們----聯邦成立之初的成員，有最優先意見權。\nADHD Hyperactive Kids----Members from the founding of the Federation, have priority opinion rights.\n\n希望大家在這裡都能玩得愉快，並保持良好的聯邦環境！\nWe hope everyone can have fun here and maintain a good Federation environment!"
+
+# Custom emoji kept in sync with local images (emoji name -> image path)
+MANAGED_EMOJI = {
+    'violette_unicorn': 'button_icon.png'
+}
+
+# Welcome button role for guilds that have not run !set_welcome_role yet
+# (guild ID -> role ID, otherwise looked up by name once and stored)
+DEFAULT_WELCOME_ROLES = {
+    1288838226362105868: 1392004567524446218
+}
+DEFAULT_WELCOME_ROLE_NAME = '聯邦住民'
@@ -0,0 +1,101 @@
+import gzip
+import json
+import time
+import asyncio
+import logging
+from typing import List, Optional
+
+# Gateway dispatches the reaction-role paths react to
+RECORDED_EVENTS = frozenset({
+    'MESSAGE_REACTION_ADD',
+    'MESSAGE_REACTION_REMOVE',
+    'INTERACTION_CREATE',
+    'GUILD_ROLE_DELETE',
+    'CHANNEL_DELETE',
+    'MESSAGE_DELETE',
+    'MESSAGE_DELETE_BULK'
+})
+# The gateway sends compact JSON, so a recorded dispatch contains one of these
+_EVENT_MARKERS = tuple(f'"t":"{name}"' for name in RECORDED_EVENTS)
+
+class EventRecorder:
+    """
+    Appends the raw gateway events the bot handles to a JSONL trace, one
+    {"ts", "t", "d"} object per line (gzip-compressed when the path ends in
+    .gz). Fed from on_socket_raw_receive; lines are buffered and written in a
+    thread so recording never blocks the event loop.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0, max_buffer: int = 1000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.logger = logging.getLogger(__name__)
+        self._buffer: List[str] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.recorded = 0
+
+    def record(self, msg):
+        """Record one raw gateway message if it is an event we replay"""
+        if isinstance(msg, bytes):
+            msg = msg.decode('utf-8')
+        # Cheap substring check before paying for a JSON parse; MESSAGE_CREATE and
+        # MESSAGE_UPDATE, the bulk of the traffic, must not get past it
+        if not any(marker in msg for marker in _EVENT_MARKERS):
+            return
+        try:
+            event = json.loads(msg)
+        except json.JSONDecodeError:
+            return
+        if event.get('op') != 0 or event.get('t') not in RECORDED_EVENTS:
+            return
+
+        data = event['d']
+        if event['t'] == 'INTERACTION_CREATE':
+            # Interaction tokens are credentials for replying; never store them
+            data = {key: value for key, value in data.items() if key != 'token'}
+        self._buffer.append(json.dumps({'ts': time.time(), 't': event['t'], 'd': data},
+                                       separators=(',', ':'), ensure_ascii=False))
+        self.recorded += 1
+
+        if len(self._buffer) >= self.max_buffer:
+            asyncio.create_task(self.flush())
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        """Write buffered events to the trace"""
+        async with self._lock:
+            if not self._buffer:
+                return
+            lines, self._buffer = self._buffer, []
+            try:
+                await asyncio.to_thread(self._append, lines)
+            except Exception as e:
+                self.logger.error(f"Error writing event trace {self.path}: {e}")
+
+    def _append(self, lines: List[str]):
+        opener = gzip.open if self.path.endswith('.gz') else open
+        with opener(self.path, 'at', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    async def close(self):
+        if self._flusher and not self._flusher.done():
+            self._flusher.cancel()
+        self._flusher = None
+        await self.flush()
+
+def read_trace(path: str):
+    """Yield recorded events from a trace written by EventRecorder"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
@@ -14,10 +14,32 @@ logging.basicConfig(
     ]
 )
 
+def create_bot():
+    """
+    Plain single-process bot by default. AUTO_SHARD=1 runs every shard in
+    this process; SHARD_COUNT/SHARD_IDS (set by `cluster.py launch`) run a
+    range of shards as one cluster worker.
+    """
+    shard_count = os.getenv('SHARD_COUNT')
+    if shard_count:
+        from cluster import ShardedReactionRoleBot
+        shard_ids = [int(shard_id) for shard_id in os.getenv('SHARD_IDS', '').split(',') if shard_id]
+        return ShardedReactionRoleBot(
+            shard_ids=shard_ids or None,
+            shard_count=int(shard_count),
+            ipc_address=os.getenv('CLUSTER_IPC'),
+            ipc_token=os.getenv('CLUSTER_IPC_TOKEN')
+        )
+    if os.getenv('AUTO_SHARD') == '1':
+        from cluster import ShardedReactionRoleBot
+        return ShardedReactionRoleBot()
+    return ReactionRoleBot()
+
 async def main():
     """Main function to start the Discord bot"""
-    # Start the keep-alive server
-    keepAlive()
+    # Start the keep-alive server (the cluster launcher runs it for its workers)
+    if not os.getenv('CLUSTER_WORKER'):
+        keepAlive()
     
     # Get bot token from environment variables
     token = os.getenv('DISCORD_BOT_TOKEN')
@@ -28,7 +50,7 @@ async def main():
         return
     
     # Create and start the bot
-    bot = ReactionRoleBot()
+    bot = create_bot()
     
     try:
         await bot.start(token)
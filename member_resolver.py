@@ -0,0 +1,84 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, Tuple
+import discord
+
+class MemberResolver:
+    """
+    Resolves members that are not in the gateway cache.
+    Concurrent lookups of the same member share one in-flight fetch_member
+    call, and fetched members are kept in a bounded LRU cache for `ttl`
+    seconds. Entries are refreshed after our own role edits and dropped when
+    the member leaves.
+    """
+
+    def __init__(self, max_size: int = 1000, ttl: float = 120.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.logger = logging.getLogger(__name__)
+        # (guild_id, user_id) -> (member, fetched_at)
+        self._cache: 'OrderedDict[Tuple[int, int], Tuple[discord.Member, float]]' = OrderedDict()
+        self._inflight: Dict[Tuple[int, int], asyncio.Future] = {}
+        self.stats = {
+            'gateway_hits': 0,
+            'cache_hits': 0,
+            'shared_fetches': 0,
+            'fetches': 0
+        }
+
+    async def resolve(self, guild: discord.Guild, user_id: int) -> discord.Member:
+        """Return the member, fetching it at most once however many callers ask"""
+        member = guild.get_member(user_id)
+        if member is not None:
+            self.stats['gateway_hits'] += 1
+            return member
+
+        key = (guild.id, user_id)
+        cached = self._cache.get(key)
+        if cached is not None:
+            member, fetched_at = cached
+            if time.monotonic() - fetched_at < self.ttl:
+                self._cache.move_to_end(key)
+                self.stats['cache_hits'] += 1
+                return member
+            del self._cache[key]
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats['shared_fetches'] += 1
+        else:
+            future = self._inflight[key] = asyncio.ensure_future(self._fetch(guild, user_id))
+        # A cancelled caller must not cancel the fetch the others are waiting on
+        return await asyncio.shield(future)
+
+    async def _fetch(self, guild: discord.Guild, user_id: int) -> discord.Member:
+        key = (guild.id, user_id)
+        try:
+            self.stats['fetches'] += 1
+            member = await guild.fetch_member(user_id)
+        finally:
+            del self._inflight[key]
+        self._store(key, member)
+        return member
+
+    def _store(self, key: Tuple[int, int], member: discord.Member):
+        self._cache[key] = (member, time.monotonic())
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def refresh(self, member: discord.Member):
+        """Replace a cached member with the copy returned by our own edit"""
+        key = (member.guild.id, member.id)
+        if key in self._cache:
+            self._store(key, member)
+
+    def invalidate(self, guild_id: int, user_id: int):
+        """Forget a member, e.g. after they left the guild"""
+        self._cache.pop((guild_id, user_id), None)
+
+    def get_stats(self) -> Dict:
+        """Cache statistics for diagnostics"""
+        return dict(self.stats, cached_members=len(self._cache), inflight=len(self._inflight))
@@ -0,0 +1,242 @@
+import heapq
+import asyncio
+import logging
+import itertools
+from collections import deque
+from typing import Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+import discord
+
+T = TypeVar('T')
+
+def get_retry_after(error: discord.DiscordException) -> Optional[float]:
+    """Seconds to wait after a 429, taken from the error or its response headers"""
+    retry_after = getattr(error, 'retry_after', None)
+    if retry_after:
+        return float(retry_after)
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    for header in ('Retry-After', 'X-RateLimit-Reset-After'):
+        if header in headers:
+            try:
+                return float(headers[header])
+            except ValueError:
+                continue
+    return None
+
+class RatePacer:
+    """
+    Spaces out calls that share a Discord rate-limit bucket.
+    Calls with the same key run one at a time, at least `interval` seconds
+    apart; a 429 pushes the key's next slot back by the advertised retry delay.
+    """
+
+    def __init__(self, interval: float = 0.3, max_retries: int = 3):
+        self.interval = interval
+        self.max_retries = max_retries
+        self.logger = logging.getLogger(__name__)
+        self._next_slot: Dict[Hashable, float] = {}
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        self.rate_limited = 0
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """Run call() in the key's next free slot, retrying after 429s"""
+        loop = asyncio.get_running_loop()
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            attempt = 0
+            while True:
+                delay = self._next_slot.get(key, 0.0) - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                try:
+                    result = await call()
+                except (discord.HTTPException, discord.RateLimited) as e:
+                    # discord.py retries short 429s itself; longer ones raise RateLimited
+                    is_429 = isinstance(e, discord.RateLimited) or e.status == 429
+                    if not is_429 or attempt >= self.max_retries:
+                        raise
+                    attempt += 1
+                    self.rate_limited += 1
+                    retry_after = max(get_retry_after(e) or 1.0, self.interval)
+                    self.logger.warning(f"Rate limited on {key}, retrying in {retry_after:.2f}s")
+                    self._next_slot[key] = loop.time() + retry_after
+                    continue
+                self._next_slot[key] = loop.time() + self.interval
+                return result
+
+# Scheduler priorities; lower runs first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_REACTION = 1
+PRIORITY_BACKFILL = 2
+
+class _GuildBucket:
+    """Learned pacing and queued jobs for one guild's member-edit bucket"""
+
+    __slots__ = ('jobs', 'interval', 'next_slot', 'stats')
+
+    def __init__(self):
+        self.jobs = []
+        # Spacing between requests, grown on rate limits and decayed on success
+        self.interval = 0.0
+        self.next_slot = 0.0
+        self.stats = {
+            'queued': 0,
+            'completed': 0,
+            'failed': 0,
+            'rate_limited': 0,
+            'total_wait': 0.0,
+            'max_wait': 0.0
+        }
+
+class GuildRequestScheduler:
+    """
+    Central queue for per-guild REST calls such as member role edits.
+    Each guild has its own priority queue and guilds are served round robin,
+    so one guild's raid cannot starve the others, and each guild has at most
+    one call in flight. discord.py sleeps through short 429s inside the call,
+    which holds that guild's slot and so paces its queue; waits longer than
+    the client's max_ratelimit_timeout raise discord.RateLimited, which grows
+    the guild's spacing and requeues the job. A global request rate plus a
+    concurrency cap keep the bot as a whole clear of the global rate limit.
+    """
+
+    def __init__(self, global_rate: float = 40.0, max_concurrency: int = 4,
+                 max_queue: int = 1000, max_interval: float = 10.0, max_retries: int = 3):
+        self.global_rate = global_rate
+        self.max_queue = max_queue
+        self.max_interval = max_interval
+        self.max_retries = max_retries
+        self.logger = logging.getLogger(__name__)
+        self._buckets: Dict[int, _GuildBucket] = {}
+        self._rotation = deque()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Condition()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._global_slot = 0.0
+        self._sequence = itertools.count()
+
+    async def run(self, guild_id: int, call: Callable[[], Awaitable[T]],
+                  priority: int = PRIORITY_REACTION) -> T:
+        """Queue call() for the guild and wait for its result"""
+        bucket = self._buckets.get(guild_id)
+        if bucket is None:
+            bucket = self._buckets[guild_id] = _GuildBucket()
+
+        if priority > PRIORITY_INTERACTIVE and len(bucket.jobs) >= self.max_queue:
+            # Backpressure: background work waits for room, clicks never do
+            async with self._space:
+                await self._space.wait_for(lambda: len(bucket.jobs) < self.max_queue)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(bucket.jobs, (priority, next(self._sequence), loop.time(), call, future, 0))
+        bucket.stats['queued'] += 1
+        if len(bucket.jobs) == 1:
+            self._rotation.append(guild_id)
+        self._wakeup.set()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        return await future
+
+    async def _dispatch(self):
+        """Hand queued jobs to workers, one guild at a time in turn"""
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            now = loop.time()
+            next_ready = None
+            for _ in range(len(self._rotation)):
+                guild_id = self._rotation.popleft()
+                bucket = self._buckets[guild_id]
+                if bucket.next_slot > now:
+                    self._rotation.append(guild_id)
+                    if bucket.next_slot != float('inf'):
+                        # Cooling down after a 429 or learned spacing
+                        next_ready = bucket.next_slot if next_ready is None else min(next_ready, bucket.next_slot)
+                    continue
+
+                job = heapq.heappop(bucket.jobs)
+                if bucket.jobs:
+                    self._rotation.append(guild_id)
+                async with self._space:
+                    self._space.notify_all()
+
+                # Global pacing, then a free worker
+                delay = self._global_slot - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self._global_slot = max(self._global_slot, loop.time()) + 1.0 / self.global_rate
+                await self._semaphore.acquire()
+                # The bucket is busy until the call finishes
+                bucket.next_slot = float('inf')
+                asyncio.create_task(self._execute(guild_id, bucket, job))
+                break
+            else:
+                # Nothing can be sent now; wait for new work, a finished call or a cooldown
+                timeout = None if next_ready is None else max(next_ready - loop.time(), 0.0)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _execute(self, guild_id: int, bucket: _GuildBucket, job):
+        priority, sequence, enqueued, call, future, attempt = job
+        loop = asyncio.get_running_loop()
+        try:
+            wait = loop.time() - enqueued
+            result = await call()
+        except discord.RateLimited as e:
+            if attempt < self.max_retries:
+                retry_after = e.retry_after or 1.0
+                bucket.stats['rate_limited'] += 1
+                bucket.interval = min(max(bucket.interval * 2, 0.25), self.max_interval)
+                bucket.next_slot = loop.time() + retry_after
+                self.logger.warning(f"Rate limited in guild {guild_id}, retrying in {retry_after:.2f}s")
+                # Back to the head of its priority level
+                heapq.heappush(bucket.jobs, (priority, sequence, enqueued, call, future, attempt + 1))
+                if len(bucket.jobs) == 1:
+                    self._rotation.append(guild_id)
+                return
+            bucket.stats['failed'] += 1
+            bucket.next_slot = loop.time() + bucket.interval
+            if not future.done():
+                future.set_exception(e)
+            return
+        except Exception as e:
+            bucket.stats['failed'] += 1
+            bucket.next_slot = loop.time() + bucket.interval
+            if not future.done():
+                future.set_exception(e)
+            return
+        finally:
+            self._semaphore.release()
+            self._wakeup.set()
+
+        bucket.stats['completed'] += 1
+        bucket.stats['total_wait'] += wait
+        bucket.stats['max_wait'] = max(bucket.stats['max_wait'], wait)
+        bucket.interval = bucket.interval * 0.9 if bucket.interval > 0.01 else 0.0
+        bucket.next_slot = loop.time() + bucket.interval
+        if not future.done():
+            future.set_result(result)
+
+    def queue_depth(self, guild_id: int) -> int:
+        bucket = self._buckets.get(guild_id)
+        return len(bucket.jobs) if bucket else 0
+
+    def get_guild_stats(self, guild_id: int) -> Dict:
+        """Queue depth, wait times and rate limits for one guild"""
+        bucket = self._buckets.get(guild_id)
+        if bucket is None:
+            return {'queue_depth': 0}
+        stats = dict(bucket.stats, queue_depth=len(bucket.jobs), interval=bucket.interval)
+        stats['avg_wait'] = stats['total_wait'] / stats['completed'] if stats['completed'] else 0.0
+        del stats['total_wait']
+        return stats
+
+    def get_stats(self) -> Dict:
+        """Queue depth per guild and in total"""
+        return {
+            'guilds': {guild_id: len(bucket.jobs) for guild_id, bucket in self._buckets.items() if bucket.jobs},
+            'queue_depth': sum(len(bucket.jobs) for bucket in self._buckets.values())
+        }
@@ -5,42 +5,47 @@ from utils import format_emoji
 class ReactionHandler:
     """Handles Discord reaction events for role assignment"""
     
-    def __init__(self, bot, config_manager):
+    def __init__(self, bot, config_manager, role_mutations):
         self.bot = bot
         self.config_manager = config_manager
+        # Role changes go through a per-member queue: events for one member
+        # apply in order and a burst of reactions becomes a single role request
+        self.role_mutations = role_mutations
         self.logger = logging.getLogger(__name__)
         
+    async def _load_guild_config(self, payload) -> bool:
+        """
+        Load the guild's config if the storage backend has not loaded it yet.
+        Returns True if the reaction's message turned out to be configured.
+        """
+        if not self.config_manager.is_guild_unloaded(payload.guild_id):
+            return False
+        await self.config_manager.ensure_guild_loaded(payload.guild_id)
+        return payload.message_id in self.config_manager.configured_message_ids
+        
     async def handle_reaction_add(self, payload):
         """Handle when a user adds a reaction"""
+        # Drop reactions on messages without reaction roles before any formatting
+        if payload.message_id not in self.config_manager.configured_message_ids:
+            if not await self._load_guild_config(payload):
+                return
+            
         # Ignore bot reactions
         if payload.user_id == self.bot.user.id:
             return
             
         # Get configuration for this reaction
-        config = await self.config_manager.get_reaction_config(
-            payload.guild_id,
-            payload.channel_id,
-            payload.message_id,
-            format_emoji(payload.emoji)
-        )
+        config = self.config_manager.lookup_reaction(payload.message_id, format_emoji(payload.emoji))
         
         if not config:
             return  # No configuration found for this reaction
             
-        # Get guild and member
+        # Get guild; the member is resolved by the role queue when the change is applied
         guild = self.bot.get_guild(payload.guild_id)
         if not guild:
             self.logger.error(f"Guild {payload.guild_id} not found")
             return
             
-        member = guild.get_member(payload.user_id)
-        if not member:
-            try:
-                member = await guild.fetch_member(payload.user_id)
-            except discord.NotFound:
-                self.logger.error(f"Member {payload.user_id} not found in guild {payload.guild_id}")
-                return
-                
         # Get role
         role = guild.get_role(config['role_id'])
         if not role:
@@ -48,16 +53,12 @@ class ReactionHandler:
             # Clean up invalid configuration
             await self.config_manager.remove_reaction_role(
                 payload.guild_id,
-                payload.channel_id,
-                payload.message_id,
-                format_emoji(payload.emoji)
+                config['channel_id'],
+                config['message_id'],
+                config['emoji']
             )
             return
             
-        # Check if member already has the role
-        if role in member.roles:
-            return
-            
         # Check bot permissions
         if not guild.me.guild_permissions.manage_roles:
             self.logger.error(f"Bot lacks manage_roles permission in guild {payload.guild_id}")
@@ -69,44 +70,39 @@ class ReactionHandler:
             
         # Assign the role
         try:
-            await member.add_roles(role, reason="Reaction role assignment")
-            self.logger.info(f"Assigned role {role.name} to {member.display_name} in guild {guild.name}")
+            # No-op when the member already has the role (or a later removal cancelled it)
+            if await self.role_mutations.add_role(guild, payload.user_id, role, reason="Reaction role assignment"):
+                self.logger.info(f"Assigned role {role.name} to {payload.user_id} in guild {guild.name}")
+        except discord.NotFound:
+            self.logger.error(f"Member {payload.user_id} not found in guild {payload.guild_id}")
         except discord.Forbidden:
-            self.logger.error(f"Forbidden: Cannot assign role {role.name} to {member.display_name}")
+            self.logger.error(f"Forbidden: Cannot assign role {role.name} to {payload.user_id}")
         except discord.HTTPException as e:
             self.logger.error(f"HTTP error assigning role: {e}")
             
     async def handle_reaction_remove(self, payload):
         """Handle when a user removes a reaction"""
+        # Drop reactions on messages without reaction roles before any formatting
+        if payload.message_id not in self.config_manager.configured_message_ids:
+            if not await self._load_guild_config(payload):
+                return
+            
         # Ignore bot reactions
         if payload.user_id == self.bot.user.id:
             return
             
         # Get configuration for this reaction
-        config = await self.config_manager.get_reaction_config(
-            payload.guild_id,
-            payload.channel_id,
-            payload.message_id,
-            format_emoji(payload.emoji)
-        )
+        config = self.config_manager.lookup_reaction(payload.message_id, format_emoji(payload.emoji))
         
         if not config:
             return  # No configuration found for this reaction
             
-        # Get guild and member
+        # Get guild; the member is resolved by the role queue when the change is applied
         guild = self.bot.get_guild(payload.guild_id)
         if not guild:
             self.logger.error(f"Guild {payload.guild_id} not found")
             return
             
-        member = guild.get_member(payload.user_id)
-        if not member:
-            try:
-                member = await guild.fetch_member(payload.user_id)
-            except discord.NotFound:
-                self.logger.error(f"Member {payload.user_id} not found in guild {payload.guild_id}")
-                return
-                
         # Get role
         role = guild.get_role(config['role_id'])
         if not role:
@@ -114,16 +110,12 @@ class ReactionHandler:
             # Clean up invalid configuration
             await self.config_manager.remove_reaction_role(
                 payload.guild_id,
-                payload.channel_id,
-                payload.message_id,
-                format_emoji(payload.emoji)
+                config['channel_id'],
+                config['message_id'],
+                config['emoji']
             )
             return
             
-        # Check if member has the role
-        if role not in member.roles:
-            return
-            
         # Check bot permissions
         if not guild.me.guild_permissions.manage_roles:
             self.logger.error(f"Bot lacks manage_roles permission in guild {payload.guild_id}")
@@ -135,9 +127,11 @@ class ReactionHandler:
             
         # Remove the role
         try:
-            await member.remove_roles(role, reason="Reaction role removal")
-            self.logger.info(f"Removed role {role.name} from {member.display_name} in guild {guild.name}")
+            if await self.role_mutations.remove_role(guild, payload.user_id, role, reason="Reaction role removal"):
+                self.logger.info(f"Removed role {role.name} from {payload.user_id} in guild {guild.name}")
+        except discord.NotFound:
+            self.logger.error(f"Member {payload.user_id} not found in guild {payload.guild_id}")
         except discord.Forbidden:
-            self.logger.error(f"Forbidden: Cannot remove role {role.name} from {member.display_name}")
+            self.logger.error(f"Forbidden: Cannot remove role {role.name} from {payload.user_id}")
         except discord.HTTPException as e:
             self.logger.error(f"HTTP error removing role: {e}")
@@ -0,0 +1,195 @@
+import os
+import json
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, Optional, Set
+import discord
+from rate_limit import PRIORITY_BACKFILL
+from utils import format_emoji
+
+class ReactionReconciler:
+    """
+    Catches up on reactions added or removed while the bot was offline.
+    For every configured message it pages through the reactors of each
+    configured emoji (100 at a time, never holding the full list) and queues
+    the missing role grants through the role queue at backfill priority.
+    Progress is checkpointed per (message, emoji) so an interrupted sweep
+    resumes where it stopped.
+
+    Revoking roles from holders who no longer react is off by default, since
+    the same role may also be granted by hand or by other bots.
+    """
+
+    def __init__(self, bot, config_manager, role_mutations, checkpoint_file='reconcile_checkpoint.json',
+                 concurrency: int = 50, checkpoint_every: int = 1000, remove_missing: bool = False):
+        self.bot = bot
+        self.config_manager = config_manager
+        self.role_mutations = role_mutations
+        self.checkpoint_file = checkpoint_file
+        self.concurrency = concurrency
+        self.checkpoint_every = checkpoint_every
+        self.remove_missing = remove_missing
+        self.logger = logging.getLogger(__name__)
+        # "<message_id>:<emoji>" -> last reactor ID processed, or True once done
+        self._checkpoint: Dict[str, object] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._slots = asyncio.Semaphore(concurrency)
+        self._inflight: Set[asyncio.Task] = set()
+        self.stats = {
+            'messages': 0,
+            'reactors_scanned': 0,
+            'roles_added': 0,
+            'roles_removed': 0,
+            'errors': 0
+        }
+
+    def start(self):
+        """Run a sweep in the background unless one is already running"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def run(self):
+        """Reconcile every configured message in every guild"""
+        self._checkpoint = await asyncio.to_thread(self._load_checkpoint)
+        if self._checkpoint:
+            self.logger.info(f"Resuming reaction reconciliation from {len(self._checkpoint)} checkpointed entries")
+
+        finished = set()
+        for guild in list(self.bot.guilds):
+            try:
+                finished |= await self.reconcile_guild(guild)
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.logger.error(f"Error reconciling reactions in guild {guild.id}: {e}")
+
+        await self._wait_inflight()
+        # Keep the progress of guilds that failed so the next sweep resumes them
+        remaining = {entry: progress for entry, progress in self._checkpoint.items() if entry not in finished}
+        if remaining:
+            await asyncio.to_thread(self._save_checkpoint, remaining)
+        else:
+            await asyncio.to_thread(self._clear_checkpoint)
+        self.logger.info(f"Reaction reconciliation finished: {self.stats}")
+
+    async def reconcile_guild(self, guild: discord.Guild) -> Set[str]:
+        """Reconcile a guild's messages; returns the checkpoint entries it covered"""
+        await self.config_manager.ensure_guild_loaded(guild.id)
+        messages = defaultdict(list)
+        for config in await self.config_manager.get_guild_configs(guild.id):
+            messages[(config['channel_id'], config['message_id'])].append(config)
+        if not messages:
+            return set()
+
+        # Role membership is read from the member cache
+        if not guild.chunked:
+            await guild.chunk()
+
+        for (channel_id, message_id), configs in messages.items():
+            if all(self._checkpoint.get(self._entry(message_id, c['emoji'])) is True for c in configs):
+                continue
+            channel = guild.get_channel(channel_id)
+            if channel is None:
+                continue
+            try:
+                message = await channel.fetch_message(message_id)
+            except (discord.NotFound, discord.Forbidden):
+                continue
+            self.stats['messages'] += 1
+            reactions = {format_emoji(reaction.emoji): reaction for reaction in message.reactions}
+            for config in configs:
+                await self._reconcile_emoji(guild, message, reactions.get(config['emoji']), config)
+        return {self._entry(message_id, config['emoji'])
+                for (_, message_id), configs in messages.items() for config in configs}
+
+    async def _reconcile_emoji(self, guild: discord.Guild, message: discord.Message,
+                               reaction: Optional[discord.Reaction], config):
+        entry = self._entry(message.id, config['emoji'])
+        progress = self._checkpoint.get(entry)
+        if progress is True:
+            return
+        role = guild.get_role(config['role_id'])
+        if role is None or role >= guild.me.top_role:
+            return
+
+        # Role holders not seen among the reactors are candidates for removal;
+        # only meaningful when the reactor list is read from the start
+        unseen = {member.id for member in role.members} if self.remove_missing and progress is None else None
+        bot_id = self.bot.user.id
+        scanned = 0
+
+        if reaction is not None:
+            after = discord.Object(id=progress) if progress else None
+            async for user in reaction.users(limit=None, after=after):
+                scanned += 1
+                if unseen is not None:
+                    unseen.discard(user.id)
+                if user.id != bot_id:
+                    member = guild.get_member(user.id)
+                    # Reactors who left the guild are not cached after chunking
+                    if member is not None and role not in member.roles:
+                        await self._queue(self.role_mutations.add_role, guild, user.id, role, 'roles_added')
+                if scanned % self.checkpoint_every == 0:
+                    # Only checkpoint past reactors whose roles were actually applied
+                    await self._wait_inflight()
+                    self._checkpoint[entry] = user.id
+                    await asyncio.to_thread(self._save_checkpoint, dict(self._checkpoint))
+            self.stats['reactors_scanned'] += scanned
+
+        for user_id in unseen or ():
+            await self._queue(self.role_mutations.remove_role, guild, user_id, role, 'roles_removed')
+
+        self._checkpoint[entry] = True
+        await asyncio.to_thread(self._save_checkpoint, dict(self._checkpoint))
+
+    async def _queue(self, method, guild: discord.Guild, user_id: int, role: discord.Role, counter: str):
+        """Start a role change, waiting while `concurrency` are already pending"""
+        await self._slots.acquire()
+        task = asyncio.create_task(self._apply(method, guild, user_id, role, counter))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _apply(self, method, guild, user_id, role, counter):
+        try:
+            if await method(guild, user_id, role, reason="Reaction role reconciliation", priority=PRIORITY_BACKFILL):
+                self.stats[counter] += 1
+        except (discord.NotFound, discord.Forbidden, discord.HTTPException) as e:
+            self.stats['errors'] += 1
+            self.logger.error(f"Error reconciling role {role.id} for {user_id} in guild {guild.id}: {e}")
+        finally:
+            self._slots.release()
+
+    async def _wait_inflight(self):
+        if self._inflight:
+            await asyncio.gather(*list(self._inflight))
+
+    @staticmethod
+    def _entry(message_id: int, emoji: str) -> str:
+        return f"{message_id}:{emoji}"
+
+    def _load_checkpoint(self) -> Dict:
+        try:
+            with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, OSError) as e:
+            self.logger.warning(f"Ignoring unreadable reconciliation checkpoint: {e}")
+            return {}
+
+    def _save_checkpoint(self, checkpoint: Dict):
+        tmp_file = f"{self.checkpoint_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f, ensure_ascii=False)
+        os.replace(tmp_file, self.checkpoint_file)
+
+    def _clear_checkpoint(self):
+        try:
+            os.remove(self.checkpoint_file)
+        except FileNotFoundError:
+            pass
+
+    def get_stats(self) -> Dict:
+        """Progress of the current or last sweep"""
+        return dict(self.stats, running=self._task is not None and not self._task.done(),
+                    pending=len(self._inflight))
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+from typing import Dict, Optional, Set, Tuple
+import discord
+from rate_limit import GuildRequestScheduler, PRIORITY_INTERACTIVE, PRIORITY_REACTION
+from member_resolver import MemberResolver
+
+class _MemberQueue:
+    """Ordered role work for one member; only one edit for it is ever in flight"""
+
+    __slots__ = ('guild', 'user_id', 'applied', 'changes', 'reasons', 'waiters', 'priority', 'urgent')
+
+    def __init__(self, guild: discord.Guild, user_id: int):
+        self.guild = guild
+        self.user_id = user_id
+        # role_id -> direction of the changes this queue already made; the
+        # gateway's member update for them may not have arrived yet
+        self.applied: Dict[int, bool] = {}
+        # Set by interactive requests so the batch goes out without waiting the window
+        self.urgent = asyncio.Event()
+        self._new_batch()
+
+    def _new_batch(self):
+        # role_id -> (role, True to add / False to remove); the latest request wins
+        self.changes: Dict[int, Tuple[discord.Role, bool]] = {}
+        self.reasons = []
+        # role_id -> future of the latest request for it; earlier ones are superseded
+        self.waiters: Dict[int, asyncio.Future] = {}
+        self.priority = None
+
+    def take(self):
+        """Hand over the collected batch and start collecting the next one"""
+        batch = self.changes, self.reasons, self.waiters, self.priority
+        self._new_batch()
+        self.urgent.clear()
+        return batch
+
+class RoleMutationCoalescer:
+    """
+    Serialised, coalescing role changes per member.
+    Every (guild_id, user_id) pair gets a small work queue drained by its own
+    task, so changes for one member are applied in the order the events
+    arrived while different members proceed in parallel. Changes collected
+    during `window` seconds are applied together: a single change with
+    add_roles/remove_roles, several with one member.edit(roles=...) built
+    from the member's live roles. An add and a remove of the same role
+    cancel out before reaching the API.
+    The edits themselves are queued on the shared GuildRequestScheduler.
+    """
+
+    def __init__(self, scheduler: Optional[GuildRequestScheduler] = None,
+                 resolver: Optional[MemberResolver] = None, window: float = 0.5):
+        self.scheduler = scheduler or GuildRequestScheduler()
+        self.resolver = resolver or MemberResolver()
+        self.window = window
+        self.logger = logging.getLogger(__name__)
+        self._queues: Dict[Tuple[int, int], _MemberQueue] = {}
+        self.stats = {
+            'requests': 0,
+            'edits': 0,
+            'cancelled': 0,
+            'redundant': 0,
+            'skipped_edits': 0
+        }
+
+    async def add_role(self, guild: discord.Guild, user_id: int, role: discord.Role,
+                       reason: Optional[str] = None, priority: int = PRIORITY_REACTION) -> bool:
+        """Queue a role grant; True if this request's grant was applied and changed the member's roles"""
+        return await self._submit(guild, user_id, role, True, reason, priority)
+
+    async def remove_role(self, guild: discord.Guild, user_id: int, role: discord.Role,
+                          reason: Optional[str] = None, priority: int = PRIORITY_REACTION) -> bool:
+        """Queue a role removal; True if this request's removal was applied and changed the member's roles"""
+        return await self._submit(guild, user_id, role, False, reason, priority)
+
+    async def _submit(self, guild: discord.Guild, user_id: int, role: discord.Role,
+                      add: bool, reason: Optional[str], priority: int) -> bool:
+        # Everything up to the await is synchronous, so the queue sees
+        # requests in exactly the order the events were dispatched
+        key = (guild.id, user_id)
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = _MemberQueue(guild, user_id)
+            asyncio.create_task(self._drain(key, queue))
+
+        previous = queue.changes.get(role.id)
+        if previous is not None and previous[1] != add:
+            # The earlier, opposite request never reaches the API
+            self.stats['cancelled'] += 1
+        superseded = queue.waiters.get(role.id)
+        if superseded is not None and not superseded.done():
+            # Only the latest request for a role can be the one that takes effect
+            superseded.set_result(False)
+        future = queue.waiters[role.id] = asyncio.get_running_loop().create_future()
+        queue.changes[role.id] = (role, add)
+        if reason and reason not in queue.reasons:
+            queue.reasons.append(reason)
+        if queue.priority is None or priority < queue.priority:
+            queue.priority = priority
+        if priority == PRIORITY_INTERACTIVE:
+            queue.urgent.set()
+        self.stats['requests'] += 1
+
+        # A cancelled caller must not fail the batch's bookkeeping
+        return await asyncio.shield(future)
+
+    async def _drain(self, key: Tuple[int, int], queue: _MemberQueue):
+        """Apply a member's batches one after another until no work is left"""
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(queue.urgent.wait(), self.window)
+                except asyncio.TimeoutError:
+                    pass
+                changes, reasons, waiters, priority = queue.take()
+                try:
+                    changed = await self._apply(queue, changes, reasons, priority)
+                except Exception as e:
+                    for future in waiters.values():
+                        if not future.done():
+                            future.set_exception(e)
+                            # Mark it retrieved in case the caller has gone away
+                            future.exception()
+                else:
+                    for role_id, future in waiters.items():
+                        if not future.done():
+                            future.set_result(role_id in changed)
+                if not queue.changes:
+                    break
+        finally:
+            del self._queues[key]
+
+    async def _apply(self, queue: _MemberQueue, changes: Dict[int, Tuple[discord.Role, bool]],
+                     reasons, priority: int) -> Set[int]:
+        """Apply one batch with a single request, returning the IDs of the roles that changed"""
+        member = await self.resolver.resolve(queue.guild, queue.user_id)
+
+        # Start from the member's live roles so changes made by anyone else
+        # are kept; only roles this queue just changed are taken from `applied`
+        current = {role.id for role in member.roles if not role.is_default()}
+        for role_id, add in queue.applied.items():
+            if add:
+                current.add(role_id)
+            else:
+                current.discard(role_id)
+
+        wanted = {role_id: (role, add) for role_id, (role, add) in changes.items() if add != (role_id in current)}
+        self.stats['redundant'] += len(changes) - len(wanted)
+        if not wanted:
+            self.stats['skipped_edits'] += 1
+            return set()
+
+        reason = '; '.join(reasons) or None
+        if len(wanted) == 1:
+            # One role: PUT/DELETE it rather than replacing the whole list
+            (role, add), = wanted.values()
+            call = (lambda: member.add_roles(role, reason=reason)) if add else \
+                   (lambda: member.remove_roles(role, reason=reason))
+        else:
+            role_ids = current | {role_id for role_id, (_, add) in wanted.items() if add}
+            role_ids -= {role_id for role_id, (_, add) in wanted.items() if not add}
+            roles = [discord.Object(id=role_id) for role_id in role_ids]
+            call = lambda: member.edit(roles=roles, reason=reason)
+
+        updated = await self.scheduler.run(queue.guild.id, call, priority)
+        if isinstance(updated, discord.Member):
+            self.resolver.refresh(updated)
+        queue.applied.update({role_id: add for role_id, (_, add) in wanted.items()})
+        self.stats['edits'] += 1
+        if len(changes) > 1:
+            self.logger.debug(f"Coalesced {len(changes)} role changes for {member} into one request")
+        return set(wanted)
+
+    def get_stats(self) -> Dict:
+        """Queue statistics for diagnostics"""
+        return dict(self.stats, active_members=len(self._queues))
@@ -0,0 +1,149 @@
+import time
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+PROCESS = 'process'
+GUILD = 'guild'
+
+class StartupTask:
+    """A unit of startup work that should run once per process or once per guild"""
+
+    __slots__ = ('name', 'func', 'scope', 'after', 'guild_filter', 'semaphore')
+
+    def __init__(self, name: str, func: Callable[..., Awaitable[None]], scope: str,
+                 after: Tuple[str, ...], guild_filter: Optional[Callable], concurrency: Optional[int]):
+        self.name = name
+        self.func = func
+        self.scope = scope
+        self.after = after
+        self.guild_filter = guild_filter
+        self.semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+
+class StartupOrchestrator:
+    """
+    Runs startup work once, however often on_ready fires.
+    Process tasks run once per process and guild tasks once per guild;
+    anything that already succeeded is skipped on reconnects, and failed
+    runs are retried the next time. Tasks run concurrently, each waiting
+    only for the tasks named in its `after`.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.tasks: Dict[str, StartupTask] = {}
+        # (task name, guild_id or None) -> status dict
+        self._runs: Dict[Tuple[str, Optional[int]], Dict] = {}
+        self._done: Dict[Tuple[str, Optional[int]], asyncio.Event] = {}
+
+    def register(self, name: str, func: Callable[..., Awaitable[None]], *, scope: str = PROCESS,
+                 after: Iterable[str] = (), guilds: Optional[Callable] = None, concurrency: Optional[int] = None):
+        """
+        Register startup work. Process tasks are called as func(); guild tasks
+        as func(guild), for every guild guilds(guild) accepts.
+        """
+        if scope not in (PROCESS, GUILD):
+            raise ValueError(f"Unknown startup task scope: {scope}")
+        for dependency in after:
+            if dependency not in self.tasks:
+                raise ValueError(f"Startup task {name} depends on unknown task {dependency}")
+        self.tasks[name] = StartupTask(name, func, scope, tuple(after), guilds, concurrency)
+
+    async def run(self, guilds: Iterable) -> int:
+        """Run everything not yet done for these guilds; returns the number of task runs started"""
+        guilds = list(guilds)
+        runs = []
+        for task in self.tasks.values():
+            if task.scope == PROCESS:
+                runs.append((task, None))
+            else:
+                runs.extend((task, guild) for guild in guilds
+                            if task.guild_filter is None or task.guild_filter(guild))
+
+        pending = [(task, guild) for task, guild in runs if not self._succeeded(task, guild)]
+        # Claim the runs and create their events before anything awaits, so a
+        # concurrent run() skips them and dependents started in this batch can
+        # wait on them; a failed run being retried gets a fresh event
+        for task, guild in pending:
+            key = self._key(task, guild)
+            run = self._runs.setdefault(key, {'state': 'pending', 'runs': 0, 'error': None, 'duration': 0.0})
+            run['state'] = 'pending'
+            event = self._done.get(key)
+            if event is None or event.is_set():
+                self._done[key] = asyncio.Event()
+        await asyncio.gather(*(self._run_one(task, guild, runs) for task, guild in pending))
+        return len(pending)
+
+    async def run_guild(self, guild) -> int:
+        """Run the guild tasks for a guild that became available after startup"""
+        return await self.run([guild])
+
+    def _key(self, task: StartupTask, guild) -> Tuple[str, Optional[int]]:
+        return task.name, guild.id if guild is not None else None
+
+    def _succeeded(self, task: StartupTask, guild) -> bool:
+        run = self._runs.get(self._key(task, guild))
+        # 'pending' runs are waiting on dependencies; they are in progress too
+        return run is not None and run['state'] in ('pending', 'running', 'done')
+
+    async def _run_one(self, task: StartupTask, guild, runs: List):
+        key = self._key(task, guild)
+        run = self._runs[key]
+        try:
+            await self._wait_for_dependencies(task, guild, runs)
+            run['state'] = 'running'
+            run['runs'] += 1
+            start = time.monotonic()
+            if task.semaphore:
+                async with task.semaphore:
+                    await self._call(task, guild)
+            else:
+                await self._call(task, guild)
+            run['duration'] = time.monotonic() - start
+            run['state'] = 'done'
+            run['error'] = None
+        except Exception as e:
+            run['state'] = 'failed'
+            run['error'] = str(e)
+            self.logger.error(f"Startup task {task.name}{f' for guild {guild.id}' if guild else ''} failed: {e}")
+        finally:
+            self._done[key].set()
+
+    @staticmethod
+    async def _call(task: StartupTask, guild):
+        if guild is None:
+            await task.func()
+        else:
+            await task.func(guild)
+
+    async def _wait_for_dependencies(self, task: StartupTask, guild, runs: List):
+        for name in task.after:
+            dependency = self.tasks[name]
+            if dependency.scope == PROCESS:
+                keys = [(name, None)]
+            elif guild is not None:
+                keys = [(name, guild.id)]
+            else:
+                # A process task after a guild task waits for every guild's run
+                keys = [self._key(other, g) for other, g in runs if other.name == name]
+            for key in keys:
+                event = self._done.get(key)
+                if event is not None:
+                    await event.wait()
+                if self._runs.get(key, {}).get('state') == 'failed':
+                    raise RuntimeError(f"dependency {name} failed")
+
+    def get_status(self) -> Dict[str, Dict]:
+        """Per-task summary: state counts, total runs and the last error"""
+        status = {}
+        for (name, guild_id), run in self._runs.items():
+            entry = status.setdefault(name, {'scope': self.tasks[name].scope, 'done': 0, 'failed': 0,
+                                             'pending': 0, 'running': 0, 'runs': 0, 'error': None})
+            entry[run['state']] += 1
+            entry['runs'] += run['runs']
+            if run['error']:
+                entry['error'] = run['error']
+        for name, task in self.tasks.items():
+            status.setdefault(name, {'scope': task.scope, 'done': 0, 'failed': 0,
+                                     'pending': 0, 'running': 0, 'runs': 0, 'error': None})
+        return status
@@ -0,0 +1,64 @@
+import json
+import asyncio
+import pytest
+from config_records import ReactionRole, compact_configs, decode_binary, encode_binary, reaction_key
+from config_storage import BinarySnapshotStorage, WELCOME_MESSAGE_KEY
+
+GUILD_ID = 1288838226362105868
+
+def guild_config(guild_id: int, emojis=('👍', '🎉', '<:violette_unicorn:123456789012345678>')):
+    return {
+        reaction_key(10, 100 + index, emoji): {'guild_id': guild_id, 'channel_id': 10, 'message_id': 100 + index,
+                                               'emoji': emoji, 'role_id': 500 + index}
+        for index, emoji in enumerate(emojis)
+    }
+
+def as_dicts(configs: dict) -> dict:
+    """Configs with ReactionRole records turned back into plain dicts"""
+    return json.loads(json.dumps(configs, default=lambda role: role.to_dict()))
+
+def test_round_trip_without_welcome_settings():
+    configs = {str(GUILD_ID): guild_config(GUILD_ID), str(GUILD_ID + 1): guild_config(GUILD_ID + 1, ('✅',))}
+    decoded = decode_binary(encode_binary(configs))
+
+    assert as_dicts(decoded) == configs
+    assert all(isinstance(value, ReactionRole) for guild in decoded.values() for value in guild.values())
+
+def test_round_trip_with_welcome_settings():
+    configs = {
+        str(GUILD_ID): dict(guild_config(GUILD_ID), **{
+            WELCOME_MESSAGE_KEY: {'channel_id': 20, 'message_id': 300, 'fingerprint': 'ab' * 32},
+            'welcome_role_id': 600,
+            'emoji_assets': {'violette_unicorn': {'hash': 'cd' * 32, 'emoji_id': 123456789012345678}}
+        }),
+        # A guild with settings but no reaction roles
+        str(GUILD_ID + 1): {'welcome_role_id': 601}
+    }
+    decoded = decode_binary(encode_binary(configs))
+
+    assert as_dicts(decoded) == configs
+    assert decoded[str(GUILD_ID)][WELCOME_MESSAGE_KEY] == configs[str(GUILD_ID)][WELCOME_MESSAGE_KEY]
+
+def test_round_trip_of_compacted_records():
+    configs = compact_configs({str(GUILD_ID): guild_config(GUILD_ID)})
+    assert decode_binary(encode_binary(configs)) == configs
+
+def test_empty_configs():
+    assert decode_binary(encode_binary({})) == {}
+
+def test_rejects_other_files():
+    with pytest.raises(ValueError):
+        decode_binary(b'{"1": {}}')
+
+def test_storage_round_trip(tmp_path):
+    config_file = tmp_path / 'config.bin'
+    configs = {str(GUILD_ID): dict(guild_config(GUILD_ID), welcome_role_id=600)}
+
+    async def run():
+        storage = BinarySnapshotStorage(str(config_file), write_behind=True)
+        await storage.load()
+        await storage.persist([{'op': 'set', 'guild': str(GUILD_ID), 'key': 'welcome_role_id', 'value': 600}], configs)
+        await storage.close()
+        return await BinarySnapshotStorage(str(config_file)).load()
+
+    assert as_dicts(asyncio.run(run())) == configs
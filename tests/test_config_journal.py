@@ -0,0 +1,117 @@
+import json
+import asyncio
+import pytest
+from config_journal import ConfigJournal, apply_record, diff_configs
+from config_records import reaction_key
+from config_storage import JournalStorage
+
+GUILD = '1288838226362105868'
+
+def mapping(message_id: int, emoji: str = '👍', role_id: int = 500):
+    return {'guild_id': int(GUILD), 'channel_id': 10, 'message_id': message_id, 'emoji': emoji, 'role_id': role_id}
+
+def set_record(message_id: int, **kwargs):
+    value = mapping(message_id, **kwargs)
+    return {'op': 'set', 'guild': GUILD, 'key': reaction_key(10, message_id, value['emoji']), 'value': value}
+
+def replay(journal_file) -> dict:
+    configs = {}
+    asyncio.run(ConfigJournal(str(journal_file)).replay(configs))
+    return configs
+
+def test_apply_record_round_trips_diff():
+    old = {GUILD: {'a': 1, 'b': 2}, '2': {'x': 1}}
+    new = {GUILD: {'a': 1, 'b': 3, 'c': 4}, '3': {'y': 5}}
+    configs = json.loads(json.dumps(old))
+    for record in diff_configs(old, new):
+        apply_record(configs, record)
+    assert configs == new
+
+def test_replay_restores_appended_records(tmp_path):
+    journal_file = tmp_path / 'config.journal'
+    records = [set_record(100), set_record(101, emoji='🎉'),
+               {'op': 'set', 'guild': GUILD, 'key': 'welcome_role_id', 'value': 42},
+               {'op': 'delete', 'guild': GUILD, 'key': reaction_key(10, 100, '👍')}]
+    asyncio.run(ConfigJournal(str(journal_file)).append(records))
+
+    assert replay(journal_file) == {GUILD: {reaction_key(10, 101, '🎉'): mapping(101, emoji='🎉'),
+                                            'welcome_role_id': 42}}
+
+def test_replay_drops_torn_last_line(tmp_path):
+    journal_file = tmp_path / 'config.journal'
+    asyncio.run(ConfigJournal(str(journal_file)).append([set_record(100), set_record(101)]))
+    complete = journal_file.read_bytes()
+    # A crash mid-append leaves a record without its terminator
+    journal_file.write_bytes(complete + json.dumps(set_record(102)).encode('utf-8')[:25])
+
+    configs = replay(journal_file)
+    assert set(configs[GUILD]) == {reaction_key(10, 100, '👍'), reaction_key(10, 101, '👍')}
+    # The torn tail is cut off, so the next append starts on a fresh line
+    assert journal_file.read_bytes() == complete
+    asyncio.run(ConfigJournal(str(journal_file)).append([set_record(103)]))
+    assert len(replay(journal_file)[GUILD]) == 3
+
+def test_replay_skips_corrupt_middle_record(tmp_path):
+    journal_file = tmp_path / 'config.journal'
+    lines = [json.dumps(set_record(100)), '{not json', json.dumps(set_record(101))]
+    journal_file.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+    assert set(replay(journal_file)[GUILD]) == {reaction_key(10, 100, '👍'), reaction_key(10, 101, '👍')}
+    # Only a torn last line is truncated
+    assert journal_file.read_text(encoding='utf-8').count('\n') == 3
+
+def test_compaction_folds_journal_into_snapshot(tmp_path):
+    config_file = tmp_path / 'config.json'
+    journal_file = tmp_path / 'config.journal'
+
+    async def write():
+        storage = JournalStorage(str(config_file), str(journal_file))
+        configs = await storage.load()
+        for message_id in (100, 101):
+            record = set_record(message_id)
+            apply_record(configs, record)
+            await storage.persist([record], configs)
+        assert journal_file.exists()
+        # close() flushes, which compacts the journal into the snapshot
+        await storage.close()
+        return configs
+
+    configs = asyncio.run(write())
+    assert not journal_file.exists()
+    assert not (tmp_path / 'config.journal.1').exists()
+    assert json.loads(config_file.read_text(encoding='utf-8')) == configs
+
+    async def reload():
+        storage = JournalStorage(str(config_file), str(journal_file))
+        return await storage.load()
+
+    assert asyncio.run(reload()) == configs
+
+def test_failed_compaction_keeps_rotated_journal(tmp_path):
+    journal_file = tmp_path / 'config.journal'
+    rotated_file = tmp_path / 'config.journal.1'
+    written = []
+
+    def fail(snapshot):
+        raise OSError("disk full")
+
+    async def run():
+        journal = ConfigJournal(str(journal_file))
+        await journal.append([set_record(100)])
+        with pytest.raises(OSError):
+            await journal.compact(lambda: {}, fail)
+        assert rotated_file.exists() and not journal_file.exists()
+        assert journal.records == 1
+
+        # Appends after the failure land in a new live journal, and both replay in order
+        await journal.append([set_record(100, role_id=501), set_record(101)])
+        configs = {}
+        assert await ConfigJournal(str(journal_file)).replay(configs) == 3
+        assert configs[GUILD][reaction_key(10, 100, '👍')]['role_id'] == 501
+
+        # The next compaction appends the live journal to the rotated one before writing
+        await journal.compact(lambda: configs, written.append)
+
+    asyncio.run(run())
+    assert written and len(written[0][GUILD]) == 2
+    assert not rotated_file.exists() and not journal_file.exists()
@@ -0,0 +1,64 @@
+import os
+import json
+import asyncio
+import pytest
+from config_manager import ConfigManager
+from config_records import reaction_key
+from config_storage import JsonFileStorage
+
+GUILD_ID = 1288838226362105868
+
+def mapping(message_id: int, emoji: str = '👍', role_id: int = 500):
+    return {'guild_id': GUILD_ID, 'channel_id': 10, 'message_id': message_id, 'emoji': emoji, 'role_id': role_id}
+
+def write_config(path, configs):
+    # The way a deploy script saves: write a temp file and rename it over
+    tmp_file = f"{path}.edit"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(configs, f)
+    os.replace(tmp_file, path)
+
+async def wait_for(condition, timeout: float = 10.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "config change was not picked up"
+        await asyncio.sleep(0.05)
+
+def test_reload_applies_only_the_diff(tmp_path):
+    config_file = tmp_path / 'config.json'
+    old_key, new_key = reaction_key(10, 100, '👍'), reaction_key(10, 101, '🎉')
+    write_config(config_file, {str(GUILD_ID): {old_key: mapping(100), 'welcome_role_id': 600}})
+
+    async def run():
+        manager = ConfigManager(JsonFileStorage(str(config_file)))
+        await manager.load_config()
+        assert manager.lookup_reaction(100, '👍') is not None
+
+        write_config(config_file, {str(GUILD_ID): {new_key: mapping(101, emoji='🎉'), 'welcome_role_id': 600}})
+        assert await manager.reload_from_disk() == 2
+        assert manager.lookup_reaction(100, '👍') is None
+        assert manager.lookup_reaction(101, '🎉')['role_id'] == 500
+        # Our own save is recognised and not reloaded
+        await manager.add_reaction_role(GUILD_ID, 10, 102, '✅', 501)
+        assert await manager.reload_from_disk() == 0
+        await manager.close()
+
+    asyncio.run(run())
+
+def test_file_watcher_picks_up_edits(tmp_path):
+    pytest.importorskip('watchfiles')
+    config_file = tmp_path / 'config.json'
+    write_config(config_file, {})
+
+    async def run():
+        manager = ConfigManager(JsonFileStorage(str(config_file)))
+        await manager.load_config()
+        # A poll interval longer than the test, so only the watcher can see the edit
+        manager.start_watching(poll_interval=3600)
+        await asyncio.sleep(0.5)
+
+        write_config(config_file, {str(GUILD_ID): {reaction_key(10, 100, '👍'): mapping(100)}})
+        await wait_for(lambda: manager.lookup_reaction(100, '👍') is not None)
+        await manager.close()
+
+    asyncio.run(run())
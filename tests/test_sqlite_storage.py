@@ -0,0 +1,52 @@
+import asyncio
+from config_manager import ConfigManager
+from config_records import reaction_key
+from config_storage import SQLiteStorage
+
+GUILD_ID = 1288838226362105868
+
+async def populate(db_file: str):
+    manager = ConfigManager(SQLiteStorage(db_file))
+    await manager.load_config()
+    await manager.add_reaction_role(GUILD_ID, 10, 100, '👍', 500)
+    await manager.add_reaction_role(GUILD_ID + 1, 11, 101, '🎉', 501)
+    await manager.set_welcome_message(GUILD_ID, 20, 300, 'ab' * 32)
+    await manager.set_guild_setting(GUILD_ID + 2, 'welcome_role_id', 600)
+    await manager.close()
+
+def test_guilds_load_on_first_use(tmp_path):
+    db_file = str(tmp_path / 'config.db')
+
+    async def run():
+        await populate(db_file)
+        storage = SQLiteStorage(db_file)
+        manager = ConfigManager(storage)
+        await manager.load_config()
+        # Nothing is read up front, but every stored guild is known
+        assert manager.configs == {}
+        assert all(manager.has_guild_config(GUILD_ID + offset) for offset in range(3))
+
+        configs = await manager.get_guild_configs(GUILD_ID)
+        assert [(config['message_id'], config['emoji'], config['role_id']) for config in configs] == [(100, '👍', 500)]
+        assert await manager.get_welcome_message(GUILD_ID) == {'channel_id': 20, 'message_id': 300,
+                                                               'fingerprint': 'ab' * 32}
+        assert set(manager.configs) == {str(GUILD_ID)}
+        assert storage.get_stats()['guild_loads'] == 1
+        assert await manager.get_guild_setting(GUILD_ID + 2, 'welcome_role_id') == 600
+        await manager.close()
+
+    asyncio.run(run())
+
+def test_load_guild_reads_one_guild(tmp_path):
+    db_file = str(tmp_path / 'config.db')
+
+    async def run():
+        await populate(db_file)
+        storage = SQLiteStorage(db_file)
+        assert await storage.list_guilds() == {str(GUILD_ID + offset) for offset in range(3)}
+        guild_config = await storage.load_guild(str(GUILD_ID + 1))
+        await storage.close()
+        return guild_config
+
+    guild_config = asyncio.run(run())
+    assert list(guild_config) == [reaction_key(11, 101, '🎉')]
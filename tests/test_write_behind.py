@@ -0,0 +1,36 @@
+import json
+import time
+import asyncio
+import threading
+from config_storage import JsonFileStorage
+
+def test_close_waits_for_in_flight_flush(tmp_path):
+    config_file = tmp_path / 'config.json'
+    storage = JsonFileStorage(str(config_file), write_behind=True, flush_delay=0.01)
+    writes = []
+    active = threading.Lock()
+    save_snapshot = storage._save_snapshot
+
+    def slow_save(snapshot):
+        # Two writers on the same temp file would find the lock taken
+        assert active.acquire(blocking=False), "snapshot writes overlapped"
+        try:
+            time.sleep(0.2)
+            save_snapshot(snapshot)
+            writes.append(snapshot)
+        finally:
+            active.release()
+    storage._save_snapshot = slow_save
+
+    async def run():
+        await storage.load()
+        await storage.persist([{'op': 'set', 'guild': '1', 'key': 'a', 'value': 1}], {'1': {'a': 1}})
+        # Let the flusher start writing, then change again and close mid-write
+        while not active.locked():
+            await asyncio.sleep(0.005)
+        await storage.persist([{'op': 'set', 'guild': '1', 'key': 'a', 'value': 2}], {'1': {'a': 2}})
+        await storage.close()
+
+    asyncio.run(run())
+    assert writes == [{'1': {'a': 1}}, {'1': {'a': 2}}]
+    assert json.loads(config_file.read_text(encoding='utf-8')) == {'1': {'a': 2}}
@@ -1,6 +1,8 @@
 import discord
 import re
-from typing import Optional, Union
+import json
+from typing import Optional, Union, List, Tuple
+import yaml
 
 def parse_emoji(emoji_str: str) -> Optional[str]:
     """
@@ -24,6 +26,9 @@ def format_emoji(emoji: Union[discord.Emoji, discord.PartialEmoji, str]) -> str:
     Format emoji object to string representation.
     """
     if isinstance(emoji, (discord.Emoji, discord.PartialEmoji)):
+        if emoji.id is None:
+            # Unicode emoji arrive as PartialEmoji without an ID
+            return emoji.name
         if emoji.animated:
             return f"<a:{emoji.name}:{emoji.id}>"
         else:
@@ -31,6 +36,43 @@ def format_emoji(emoji: Union[discord.Emoji, discord.PartialEmoji, str]) -> str:
     else:
         return str(emoji)
 
+def parse_reaction_menu(text: str) -> List[Tuple[str, str]]:
+    """
+    Parse an inline reaction menu: one "emoji role" pair per line or
+    separated by commas, e.g. "🔴 Red, 🔵 @Blue Team".
+    """
+    pairs = []
+    for item in re.split(r'[,\n]', text):
+        parts = item.strip().split(None, 1)
+        if len(parts) == 2:
+            pairs.append((parts[0], parts[1].strip()))
+        elif parts:
+            raise ValueError(f"Missing role for {parts[0]}")
+    return pairs
+
+def load_reaction_menu_file(data: bytes, filename: str) -> List[Tuple[str, str]]:
+    """
+    Parse a JSON or YAML menu attachment.
+    Accepts {"emoji": "role", ...} or [{"emoji": ..., "role": ...}, ...].
+    """
+    text = data.decode('utf-8')
+    if filename.lower().endswith(('.yml', '.yaml')):
+        try:
+            menu = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise ValueError(f"Invalid YAML menu: {e}") from e
+    else:
+        menu = json.loads(text)
+
+    if isinstance(menu, dict):
+        return [(str(emoji), str(role)) for emoji, role in menu.items()]
+    if isinstance(menu, list):
+        try:
+            return [(str(item['emoji']), str(item['role'])) for item in menu]
+        except (KeyError, TypeError):
+            raise ValueError("Each menu entry needs an 'emoji' and a 'role'")
+    raise ValueError("Menu must be a mapping or a list of entries")
+
 def get_role_by_name_or_id(guild: discord.Guild, role_identifier: str) -> Optional[discord.Role]:
     """
     Get a role by name or ID from a guild.
@@ -0,0 +1,264 @@
+import json
+import asyncio
+import hashlib
+import logging
+from collections import deque
+from typing import Dict, Optional
+import discord
+import constants
+from commands import WelcomeView, WELCOME_BUTTON_ID
+from rate_limit import PRIORITY_INTERACTIVE
+
+# Guild setting holding the role ID the welcome button grants
+WELCOME_ROLE_KEY = 'welcome_role_id'
+
+def welcome_fingerprint(text: str, view: discord.ui.View) -> str:
+    """Hash of the message text plus the parts of the view users can see"""
+    signature = [
+        {
+            'type': type(item).__name__,
+            'label': getattr(item, 'label', None),
+            'style': getattr(getattr(item, 'style', None), 'value', None),
+            'emoji': str(getattr(item, 'emoji', None) or ''),
+            'custom_id': getattr(item, 'custom_id', None),
+            'row': item.row
+        }
+        for item in view.children
+    ]
+    payload = json.dumps({'text': text, 'view': signature}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class WelcomeMessages:
+    """
+    Keeps one welcome message per guild up to date. The stored reference
+    carries a fingerprint of what was last posted, so a restart costs one
+    fetch_message, and a changed text or button is edited in place. Old copies
+    are only swept (in one bulk purge) when the stored message is gone.
+    """
+
+    def __init__(self, bot, config_manager, purge_limit: int = 50):
+        self.bot = bot
+        self.config_manager = config_manager
+        self.purge_limit = purge_limit
+        self.logger = logging.getLogger(__name__)
+        # guild_id -> welcome role ID, so button clicks never touch the config store
+        self._role_ids: Dict[int, int] = {}
+        self.stats = {
+            'unchanged': 0,
+            'edited': 0,
+            'sent': 0,
+            'purged': 0
+        }
+
+    async def get_role(self, guild) -> Optional[discord.Role]:
+        """The role the welcome button grants in a guild"""
+        role_id = self._role_ids.get(guild.id)
+        if role_id is None:
+            role_id = await self.config_manager.get_guild_setting(guild.id, WELCOME_ROLE_KEY)
+            if role_id is None:
+                role_id = await self._migrate_role(guild)
+            # A missing role is looked up again next time, so one created later is found
+            if role_id is not None:
+                self._role_ids[guild.id] = role_id
+        return guild.get_role(role_id) if role_id is not None else None
+
+    async def _migrate_role(self, guild) -> Optional[int]:
+        """Store the role the old hard-coded lookup would have picked"""
+        role_id = constants.DEFAULT_WELCOME_ROLES.get(guild.id)
+        if role_id is None:
+            role = discord.utils.get(guild.roles, name=constants.DEFAULT_WELCOME_ROLE_NAME)
+            role_id = role.id if role else None
+        if role_id is not None:
+            await self.config_manager.set_guild_setting(guild.id, WELCOME_ROLE_KEY, role_id)
+        return role_id
+
+    async def set_role(self, guild_id: int, role_id: int):
+        """Set the role the welcome button grants"""
+        await self.config_manager.set_guild_setting(guild_id, WELCOME_ROLE_KEY, role_id)
+        self._role_ids[guild_id] = role_id
+
+    def _render(self):
+        view = WelcomeView(self.bot)
+        return constants.WELCOME_TEXT, view, welcome_fingerprint(constants.WELCOME_TEXT, view)
+
+    async def ensure(self, guild, channel: Optional[discord.TextChannel] = None) -> Optional[discord.Message]:
+        """
+        Make sure the guild's welcome message exists and is current. With a
+        channel, the message is moved there if it lives elsewhere; otherwise
+        the stored channel or the first channel the bot can post in is used.
+        """
+        text, view, fingerprint = self._render()
+        stored = await self.config_manager.get_welcome_message(guild.id)
+        preferred = None
+
+        if stored:
+            stored_channel = guild.get_channel(stored['channel_id'])
+            if stored_channel is not None and (channel is None or stored_channel.id == channel.id):
+                message = await self._update_stored(guild, stored_channel, stored, text, view, fingerprint)
+                if message is not None:
+                    return message
+                # Repost there if possible, but don't give up if the bot lost access to it
+                preferred = stored_channel
+            elif stored_channel is not None:
+                # Moving to another channel: drop the old copy without fetching it
+                try:
+                    await stored_channel.get_partial_message(stored['message_id']).delete()
+                except discord.HTTPException:
+                    pass
+            await self.config_manager.remove_welcome_message(guild.id)
+
+        if channel:
+            channels = [channel]
+        else:
+            channels = [c for c in guild.text_channels if c.permissions_for(guild.me).send_messages]
+            if preferred in channels:
+                channels.remove(preferred)
+                channels.insert(0, preferred)
+        for target in channels:
+            try:
+                await self._purge_old(guild, target)
+                message = await target.send(text, view=view)
+            except discord.Forbidden:
+                continue
+            except discord.HTTPException as e:
+                self.logger.error(f"Error sending welcome message in {guild.name} #{target.name}: {e}")
+                continue
+            await self.config_manager.set_welcome_message(guild.id, target.id, message.id, fingerprint)
+            self.stats['sent'] += 1
+            self.logger.info(f"Sent welcome message in {guild.name} #{target.name}")
+            return message
+        return None
+
+    async def _update_stored(self, guild, channel, stored: Dict, text: str, view, fingerprint: str):
+        """Edit the stored message in place if it changed; None if it is gone"""
+        try:
+            message = await channel.fetch_message(stored['message_id'])
+        except (discord.NotFound, discord.Forbidden):
+            return None
+
+        if stored.get('fingerprint') == fingerprint:
+            self.stats['unchanged'] += 1
+            self.logger.debug(f"Welcome message already current in {guild.name} #{channel.name}")
+            return message
+
+        await message.edit(content=text, view=view)
+        await self.config_manager.set_welcome_message(guild.id, channel.id, message.id, fingerprint)
+        self.stats['edited'] += 1
+        self.logger.info(f"Updated welcome message in {guild.name} #{channel.name}")
+        return message
+
+    @staticmethod
+    def _is_welcome(message: discord.Message) -> bool:
+        """Whether a message is a copy of the welcome message"""
+        if not message.components:
+            return False
+        # Copies posted before the button had a stable custom_id are matched by their text
+        return message.content == constants.WELCOME_TEXT or any(
+            getattr(child, 'custom_id', None) == WELCOME_BUTTON_ID
+            for row in message.components for child in getattr(row, 'children', ()))
+
+    async def _purge_old(self, guild, channel):
+        """Delete stray welcome messages of ours, in one bulk request when allowed"""
+        try:
+            deleted = await channel.purge(
+                limit=self.purge_limit,
+                # Only welcome copies; our other messages stay
+                check=lambda message: message.author == guild.me and self._is_welcome(message),
+                # Bulk delete needs Manage Messages; our own messages can always go one by one
+                bulk=channel.permissions_for(guild.me).manage_messages,
+                reason="Replacing welcome message"
+            )
+        except discord.HTTPException as e:
+            self.logger.warning(f"Could not clear old welcome messages in {guild.name} #{channel.name}: {e}")
+            return
+        if deleted:
+            self.stats['purged'] += len(deleted)
+            self.logger.info(f"Deleted {len(deleted)} old welcome message(s) in {guild.name} #{channel.name}")
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats)
+
+class WelcomeGrants:
+    """
+    Welcome button role grants that survive click bursts. A grant goes
+    through the per-guild role scheduler at interactive priority; if it lands
+    within ack_deadline the click is answered with the result, otherwise it
+    is acknowledged right away (interactions must be answered within 3s) and
+    the user gets a follow-up once the role is granted.
+    """
+
+    def __init__(self, role_mutations, ack_deadline: float = 1.5, samples: int = 1000):
+        self.role_mutations = role_mutations
+        self.ack_deadline = ack_deadline
+        self.logger = logging.getLogger(__name__)
+        # Seconds since the click, for the most recent `samples` clicks
+        self._ack_times = deque(maxlen=samples)
+        self._grant_times = deque(maxlen=samples)
+        self.stats = {
+            'clicks': 0,
+            'answered': 0,
+            'deferred': 0,
+            'granted': 0,
+            'failed': 0
+        }
+
+    @staticmethod
+    def _since_click(interaction: discord.Interaction) -> float:
+        return (discord.utils.utcnow() - interaction.created_at).total_seconds()
+
+    async def grant(self, interaction: discord.Interaction, role: discord.Role):
+        """Grant the welcome role for a button click and answer the interaction"""
+        self.stats['clicks'] += 1
+        task = asyncio.ensure_future(self.role_mutations.add_role(
+            interaction.guild, interaction.user.id, role,
+            reason="Welcome button", priority=PRIORITY_INTERACTIVE
+        ))
+        done, _ = await asyncio.wait({task}, timeout=self.ack_deadline)
+
+        if done:
+            # Quiet path: one response carrying the result
+            error = self._finish(interaction, task)
+            await interaction.response.send_message(f"❌ Error: {error}" if error else "✅ Welcome!", ephemeral=True)
+            self.stats['answered'] += 1
+            self._ack_times.append(self._since_click(interaction))
+            return
+
+        # Burst path: acknowledge now, report when the queued grant lands
+        await interaction.response.send_message("⏳ 處理中… Your role is on its way!", ephemeral=True)
+        self.stats['deferred'] += 1
+        self._ack_times.append(self._since_click(interaction))
+        await asyncio.wait({task})
+        error = self._finish(interaction, task)
+        try:
+            await interaction.followup.send(f"❌ Error: {error}" if error else "✅ Welcome!", ephemeral=True)
+        except discord.HTTPException as e:
+            self.logger.warning(f"Could not send welcome follow-up to {interaction.user.id}: {e}")
+
+    def _finish(self, interaction: discord.Interaction, task: asyncio.Future) -> Optional[str]:
+        """Record a finished grant; returns the error message if it failed"""
+        try:
+            task.result()
+        except Exception as e:
+            self.stats['failed'] += 1
+            self.logger.error(f"Error granting welcome role to {interaction.user.id}: {e}")
+            return str(e)
+        self.stats['granted'] += 1
+        self._grant_times.append(self._since_click(interaction))
+        return None
+
+    @staticmethod
+    def _summary(name: str, samples) -> Dict:
+        if not samples:
+            return {}
+        ordered = sorted(samples)
+        return {
+            f'{name}_p50': ordered[len(ordered) // 2],
+            f'{name}_p95': ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)],
+            f'{name}_max': ordered[-1]
+        }
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats.update(self._summary('time_to_ack', self._ack_times))
+        stats.update(self._summary('time_to_grant', self._grant_times))
+        return stats
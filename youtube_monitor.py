@@ -4,18 +4,42 @@ import os
 from datetime import datetime, timedelta
 import aiohttp
 import json
-from typing import Optional, Dict, Any
+import xml.etree.ElementTree as ET
+from typing import Optional, Dict, List, Tuple
+
+YOUTUBE_API_URL = 'https://www.googleapis.com/youtube/v3'
+YOUTUBE_FEED_URL = 'https://www.youtube.com/feeds/videos.xml'
+ATOM_NS = {'atom': 'http://www.w3.org/2005/Atom', 'yt': 'http://www.youtube.com/xml/schemas/2015'}
 
 class YouTubeMonitor:
     """Monitors YouTube channel for new videos and sends Discord notifications"""
     
-    def __init__(self, bot):
+    def __init__(self, bot, api_url: Optional[str] = None, feed_url: Optional[str] = None):
         self.bot = bot
         self.logger = logging.getLogger(__name__)
         self.api_key = os.getenv('YOUTUBE_API_KEY')
         self.channel_id = None  # Will be set by user
-        self.last_video_id = None
-        self.check_interval = 300  # Check every 5 minutes
+        # Video IDs already announced (or present when monitoring started)
+        self.seen_video_ids = set()
+        self._primed = False
+        # 'playlist' polls the uploads playlist (1 quota unit, needs the API key);
+        # 'feed' polls the public Atom feed (no key, no quota)
+        self.source = os.getenv('YOUTUBE_SOURCE', 'playlist' if self.api_key else 'feed')
+        # Unchanged polls are answered with 304, so polling often is cheap
+        self.check_interval = int(os.getenv('YOUTUBE_CHECK_INTERVAL', '60'))
+        self.api_url = api_url or os.getenv('YOUTUBE_API_URL', YOUTUBE_API_URL)
+        self.feed_url = feed_url or os.getenv('YOUTUBE_FEED_URL', YOUTUBE_FEED_URL)
+        # Validators from the last 200 response, sent back as If-None-Match / If-Modified-Since
+        self._etag = None
+        self._last_modified = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.stats = {
+            'polls': 0,
+            'not_modified': 0,
+            'new_videos': 0,
+            'errors': 0,
+            'quota_units': 0
+        }
         self.guild_id = 1288838226362105868  # 澪夜聯邦 server ID
         self.notification_channel_id = 1392034508747837520  # Specific channel for notifications
         # Auto-set the Violette channel only if API key exists
@@ -39,6 +63,8 @@ class YouTubeMonitor:
                 self.channel_id = channel_url_or_id
                 
             if self.channel_id:
+                # A different channel has different validators and uploads
+                self._reset_detection()
                 self.logger.info(f"YouTube channel set to: {self.channel_id}")
                 return True
             return False
@@ -58,7 +84,7 @@ class YouTubeMonitor:
         if not self.api_key:
             return None
             
-        url = f"https://www.googleapis.com/youtube/v3/channels"
+        url = f"{self.api_url}/channels"
         params = {
             'part': 'id',
             'forUsername': username,
@@ -75,39 +101,106 @@ class YouTubeMonitor:
             self.logger.error(f"Error resolving username: {e}")
         return None
     
+    def _reset_detection(self):
+        self.seen_video_ids = set()
+        self._primed = False
+        self._etag = None
+        self._last_modified = None
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30))
+        return self._session
+    
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+    
+    def _request(self) -> Tuple[str, Dict[str, str]]:
+        """URL and query for the configured source"""
+        if self.source == 'playlist':
+            # Every channel's uploads playlist is its channel ID with UC -> UU
+            return f"{self.api_url}/playlistItems", {
+                'part': 'snippet',
+                'playlistId': 'UU' + self.channel_id[2:],
+                'maxResults': '10',
+                'key': self.api_key
+            }
+        return self.feed_url, {'channel_id': self.channel_id}
+    
     async def check_for_new_videos(self):
         """Check for new videos on the monitored channel"""
-        if not self.api_key or not self.channel_id:
+        if not self.channel_id or (self.source == 'playlist' and not self.api_key):
             return
             
-        url = f"https://www.googleapis.com/youtube/v3/search"
-        params = {
-            'part': 'snippet',
-            'channelId': self.channel_id,
-            'order': 'date',
-            'maxResults': 1,
-            'type': 'video',
-            'key': self.api_key
-        }
+        url, params = self._request()
+        headers = {}
+        if self._etag:
+            headers['If-None-Match'] = self._etag
+        if self._last_modified:
+            headers['If-Modified-Since'] = self._last_modified
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    data = await response.json()
-                    
-                    if 'items' in data and data['items']:
-                        latest_video = data['items'][0]
-                        video_id = latest_video['id']['videoId']
-                        
-                        # Check if this is a new video
-                        if video_id != self.last_video_id:
-                            self.last_video_id = video_id
-                            await self._send_notification(latest_video)
-                            
-        except Exception as e:
+            async with self._get_session().get(url, params=params, headers=headers) as response:
+                self.stats['polls'] += 1
+                if self.source == 'playlist':
+                    self.stats['quota_units'] += 1
+                if response.status == 304:
+                    self.stats['not_modified'] += 1
+                    return
+                if response.status != 200:
+                    self.stats['errors'] += 1
+                    self.logger.error(f"YouTube {self.source} poll failed: HTTP {response.status}")
+                    return
+                body = await response.text()
+                etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.stats['errors'] += 1
             self.logger.error(f"Error checking for new videos: {e}")
+            return
+        
+        try:
+            videos = self._parse_playlist(body) if self.source == 'playlist' else self._parse_feed(body)
+        except (ValueError, KeyError, ET.ParseError) as e:
+            self.stats['errors'] += 1
+            self.logger.error(f"Error parsing YouTube {self.source} response: {e}")
+            return
+        # Only trust the validators once the body they describe was handled
+        self._etag, self._last_modified = etag, last_modified
+        
+        new_videos = [(video_id, title) for video_id, title in videos if video_id not in self.seen_video_ids]
+        self.seen_video_ids.update(video_id for video_id, _ in videos)
+        if not self._primed:
+            # Whatever is already uploaded when monitoring starts is not news
+            self._primed = True
+            return
+        # Newest first in both sources; announce in upload order
+        for video_id, title in reversed(new_videos):
+            self.stats['new_videos'] += 1
+            await self._send_notification(video_id, title)
+    
+    @staticmethod
+    def _parse_playlist(body: str) -> List[Tuple[str, str]]:
+        """(video_id, title) pairs from a playlistItems.list response"""
+        return [
+            (item['snippet']['resourceId']['videoId'], item['snippet']['title'])
+            for item in json.loads(body).get('items', [])
+        ]
+    
+    @staticmethod
+    def _parse_feed(body: str) -> List[Tuple[str, str]]:
+        """(video_id, title) pairs from a channel's Atom feed"""
+        root = ET.fromstring(body)
+        return [
+            (entry.findtext('yt:videoId', namespaces=ATOM_NS), entry.findtext('atom:title', default='', namespaces=ATOM_NS))
+            for entry in root.findall('atom:entry', ATOM_NS)
+            if entry.findtext('yt:videoId', namespaces=ATOM_NS)
+        ]
     
-    async def _send_notification(self, video_data: Dict[str, Any]):
+    def get_stats(self) -> Dict:
+        return dict(self.stats, source=self.source, etag=bool(self._etag), last_modified=bool(self._last_modified))
+    
+    async def _send_notification(self, video_id: str, video_title: str):
         """Send Discord notification for new video"""
         try:
             guild = self.bot.get_guild(self.guild_id)
@@ -124,8 +217,7 @@ class YouTubeMonitor:
                 self.logger.error(f"No permission to send messages in channel {notification_channel.name}")
                 return
                 
-            video_title = video_data['snippet']['title']
-            video_url = f"https://www.youtube.com/watch?v={video_data['id']['videoId']}"
+            video_url = f"https://www.youtube.com/watch?v={video_id}"
             
             message = (
                 "@everyone\n"
@@ -143,15 +235,15 @@ class YouTubeMonitor:
     
     async def start_monitoring(self):
         """Start the YouTube monitoring loop"""
-        if not self.api_key:
+        if self.source == 'playlist' and not self.api_key:
             self.logger.error("YouTube API key not found. Please set YOUTUBE_API_KEY environment variable.")
             return
             
         if not self.channel_id:
+            # Keep polling; checks are skipped until a channel is set
             self.logger.warning("YouTube channel not set. Use !set_youtube_channel command first.")
-            return
             
-        self.logger.info("Starting YouTube monitoring...")
+        self.logger.info(f"Starting YouTube monitoring ({self.source})...")
         
         while True:
             try: